@@ -14,11 +14,16 @@ Script to integrate CARLA and SUMO simulations
 # ==================================================================================================
 
 import argparse
+import collections
+import concurrent.futures
 import logging
 import os
 import sys
+import threading
 import time
 
+import numpy as np
+
 # ==================================================================================================
 # -- find traci module -----------------------------------------------------------------------------
 # ==================================================================================================
@@ -37,6 +42,49 @@ from sumo_integration.carla_simulation import CarlaSimulation  # pylint: disable
 from sumo_integration.constants import INVALID_ACTOR_ID  # pylint: disable=wrong-import-position
 from sumo_integration.sumo_simulation import SumoSimulation  # pylint: disable=wrong-import-position
 
+# ==================================================================================================
+# -- timing ----------------------------------------------------------------------------------------
+# ==================================================================================================
+
+LOCKSTEP = 'lockstep'
+PIPELINED = 'pipelined'
+
+TIMING_REPORT_INTERVAL = 10.0  # seconds
+
+
+class PhaseTimings(object):
+    """
+    PhaseTimings accumulates the wall-clock time spent in each phase of the synchronization. Phases
+    may be recorded from different threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = collections.defaultdict(float)
+        self._counts = collections.defaultdict(int)
+
+    def record(self, phase, elapsed):
+        """
+        Records the duration (in seconds) of one execution of the given phase.
+        """
+        with self._lock:
+            self._totals[phase] += elapsed
+            self._counts[phase] += 1
+
+    def pop_averages(self):
+        """
+        Returns the average duration in milliseconds of each phase since the last call.
+            :returns dict: {phase: average_ms}
+        """
+        with self._lock:
+            averages = {
+                phase: 1000.0 * total / self._counts[phase]
+                for phase, total in self._totals.items()
+            }
+            self._totals.clear()
+            self._counts.clear()
+        return averages
+
+
 # ==================================================================================================
 # -- synchronization_loop --------------------------------------------------------------------------
 # ==================================================================================================
@@ -52,11 +100,19 @@ class SimulationSynchronization(object):
                  carla_simulation,
                  tls_manager='none',
                  sync_vehicle_color=False,
-                 sync_vehicle_lights=False):
+                 sync_vehicle_lights=False,
+                 scheduler=LOCKSTEP):
 
         self.sumo = sumo_simulation
         self.carla = carla_simulation
 
+        # With the pipelined scheduler, sumo is stepped in a worker thread while carla ticks.
+        self.scheduler = scheduler
+        self._executor = None
+        if scheduler == PIPELINED:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.timings = PhaseTimings()
+
         self.tls_manager = tls_manager
         self.sync_vehicle_color = sync_vehicle_color
         self.sync_vehicle_lights = sync_vehicle_lights
@@ -66,12 +122,22 @@ class SimulationSynchronization(object):
         elif tls_manager == 'sumo':
             self.carla.switch_off_traffic_lights()
 
+        # Last traffic light state applied to each landmark, and number of traffic light commands
+        # sent during the last tick.
+        self._tl_states = {}  # {landmark_id: state}
+        self.tl_commands = 0
+
         # Mapped actor ids.
         self.sumo2carla_ids = {}  # Contains only actors controlled by sumo.
         self.carla2sumo_ids = {}  # Contains only actors controlled by carla.
 
+        # Sumo actors spawned while not reported by sumo (e.g., teleporting). Their spawn in carla
+        # is retried every step.
+        self._unresolved_sumo_actors = set()
+
         BridgeHelper.blueprint_library = self.carla.world.get_blueprint_library()
         BridgeHelper.offset = self.sumo.get_net_offset()
+        BridgeHelper.clear_cache()
 
         # Configuring carla simulation in sync mode.
         settings = self.carla.world.get_settings()
@@ -86,16 +152,65 @@ class SimulationSynchronization(object):
         """
         Tick to simulation synchronization
         """
-        # -----------------
-        # sumo-->carla sync
-        # -----------------
-        self.sumo.tick()
+        self.tl_commands = 0
+        if self.scheduler == PIPELINED:
+            self._pipelined_tick()
+        else:
+            self._lockstep_tick()
+
+        if self.tl_commands > 0:
+            logging.debug('Traffic light commands sent this step: %d', self.tl_commands)
+
+    def _lockstep_tick(self):
+        """
+        Strict lock-step: sumo step, sumo-->carla sync, carla step and carla-->sumo sync.
+        """
+        self._timed('sumo_tick', self.sumo.tick)
+        self._timed('sumo_to_carla', self._sync_sumo_to_carla)
+        self._timed('carla_tick', self.carla.tick)
+        self._timed('carla_to_sumo', self._sync_carla_to_sumo)
+
+    def _pipelined_tick(self):
+        """
+        Pipelined: both directions are synchronized with the latest state of each simulator and
+        then sumo and carla are stepped in parallel. Carla renders sumo step k while sumo computes
+        step k + 1, and sumo receives the carla state one step late.
+        """
+        self._timed('sumo_to_carla', self._sync_sumo_to_carla)
+        self._timed('carla_to_sumo', self._sync_carla_to_sumo)
+
+        start = time.time()
+        sumo_step = self._executor.submit(self._timed, 'sumo_tick', self.sumo.tick)
+        try:
+            self._timed('carla_tick', self.carla.tick)
+        finally:
+            sumo_step.result()
+        self.timings.record('parallel_tick', time.time() - start)
+
+    def _timed(self, phase, function):
+        """
+        Runs the given function recording its duration under the given phase name.
+        """
+        start = time.time()
+        result = function()
+        self.timings.record(phase, time.time() - start)
+        return result
 
+    def _sync_sumo_to_carla(self):
+        """
+        Applies the current sumo state to carla.
+        """
         # Spawning new sumo actors in carla (i.e, not controlled by carla).
-        sumo_spawned_actors = self.sumo.spawned_actors - set(self.carla2sumo_ids.values())
+        self._unresolved_sumo_actors -= self.sumo.destroyed_actors
+        sumo_spawned_actors = (self.sumo.spawned_actors | self._unresolved_sumo_actors) - set(
+            self.carla2sumo_ids.values())
+        self._unresolved_sumo_actors = set()
         for sumo_actor_id in sumo_spawned_actors:
             self.sumo.subscribe(sumo_actor_id)
             sumo_actor = self.sumo.get_actor(sumo_actor_id)
+            if sumo_actor is None:
+                self._unresolved_sumo_actors.add(sumo_actor_id)
+                continue
 
             carla_blueprint = BridgeHelper.get_carla_blueprint(sumo_actor, self.sync_vehicle_color)
             if carla_blueprint is not None:
@@ -113,36 +228,54 @@ class SimulationSynchronization(object):
             if sumo_actor_id in self.sumo2carla_ids:
                 self.carla.destroy_actor(self.sumo2carla_ids.pop(sumo_actor_id))
 
-        # Updating sumo actors in carla.
-        for sumo_actor_id in self.sumo2carla_ids:
-            carla_actor_id = self.sumo2carla_ids[sumo_actor_id]
-
-            sumo_actor = self.sumo.get_actor(sumo_actor_id)
-            carla_actor = self.carla.get_actor(carla_actor_id)
-
-            carla_transform = BridgeHelper.get_carla_transform(sumo_actor.transform,
-                                                               sumo_actor.extent)
+        # Updating sumo actors in carla. All the poses and light states of the step are sent to
+        # carla in a single batch. Actors not reported by sumo in this step (NaN rows) keep their
+        # last pose.
+        locations, rotations, extents, signals = self.sumo.get_actor_poses(
+            list(self.sumo2carla_ids))
+        valid = ~np.isnan(locations[:, 0])
+        carla_actor_ids = [
+            carla_actor_id
+            for carla_actor_id, is_valid in zip(self.sumo2carla_ids.values(), valid) if is_valid
+        ]
+        signals = [sumo_signals for sumo_signals, is_valid in zip(signals, valid) if is_valid]
+        carla_transforms = BridgeHelper.to_carla_transforms(
+            *BridgeHelper.get_carla_transforms_array(locations[valid], rotations[valid],
+                                                     extents[valid]))
+
+        updates = []
+        for carla_actor_id, sumo_signals, carla_transform in zip(carla_actor_ids, signals,
+                                                                 carla_transforms):
+            carla_lights = None
             if self.sync_vehicle_lights:
-                carla_lights = BridgeHelper.get_carla_lights_state(carla_actor.get_light_state(),
-                                                                   sumo_actor.signals)
-            else:
-                carla_lights = None
+                current_lights = self.carla.get_vehicle_light_state(carla_actor_id)
+                if current_lights is not None:
+                    carla_lights = BridgeHelper.get_carla_lights_state(current_lights,
+                                                                       sumo_signals)
+
+            updates.append((carla_actor_id, carla_transform, carla_lights))
 
-            self.carla.synchronize_vehicle(carla_actor_id, carla_transform, carla_lights)
+        self.carla.synchronize_vehicles(updates)
 
-        # Updates traffic lights in carla based on sumo information.
+        # Updates traffic lights in carla based on sumo information. Only the landmarks whose sumo
+        # traffic light changed of phase during this step are visited, and only transitions are
+        # sent.
         if self.tls_manager == 'sumo':
-            common_landmarks = self.sumo.traffic_light_ids & self.carla.traffic_light_ids
+            common_landmarks = self.sumo.changed_traffic_light_ids & self.carla.traffic_light_ids
+            carla_tl_states = {}
             for landmark_id in common_landmarks:
                 sumo_tl_state = self.sumo.get_traffic_light_state(landmark_id)
                 carla_tl_state = BridgeHelper.get_carla_traffic_light_state(sumo_tl_state)
+                if self._tl_states.get(landmark_id) != carla_tl_state:
+                    carla_tl_states[landmark_id] = carla_tl_state
 
-                self.carla.synchronize_traffic_light(landmark_id, carla_tl_state)
+            self.tl_commands += self.carla.synchronize_traffic_lights(carla_tl_states)
+            self._tl_states.update(carla_tl_states)
 
-        # -----------------
-        # carla-->sumo sync
-        # -----------------
-        self.carla.tick()
+    def _sync_carla_to_sumo(self):
+        """
+        Applies the current carla state to sumo.
+        """
 
         # Spawning new carla actors (not controlled by sumo)
         carla_spawned_actors = self.carla.spawned_actors - set(self.sumo2carla_ids.values())
@@ -162,41 +295,57 @@ class SimulationSynchronization(object):
             if carla_actor_id in self.carla2sumo_ids:
                 self.sumo.destroy_actor(self.carla2sumo_ids.pop(carla_actor_id))
 
-        # Updating carla actors in sumo.
-        for carla_actor_id in self.carla2sumo_ids:
+        # Updating carla actors in sumo. Poses are read from the carla snapshot of this step, with
+        # the extents cached when the actors appeared.
+        carla_actor_ids = list(self.carla2sumo_ids)
+        locations, rotations, extents = self.carla.get_actor_poses(carla_actor_ids)
+        sumo_locations, sumo_rotations = BridgeHelper.get_sumo_transforms_array(
+            locations, rotations, extents)
+
+        # Actors missing from the snapshot (e.g., removed by another client) are skipped.
+        valid = ~np.isnan(locations[:, 0])
+        sumo_actor_ids = []
+        sumo_signals = []
+        for carla_actor_id, is_valid in zip(carla_actor_ids, valid):
+            if not is_valid:
+                continue
             sumo_actor_id = self.carla2sumo_ids[carla_actor_id]
 
-            carla_actor = self.carla.get_actor(carla_actor_id)
-            sumo_actor = self.sumo.get_actor(sumo_actor_id)
-
-            sumo_transform = BridgeHelper.get_sumo_transform(carla_actor.get_transform(),
-                                                             carla_actor.bounding_box.extent)
+            sumo_lights = None
             if self.sync_vehicle_lights:
                 carla_lights = self.carla.get_actor_light_state(carla_actor_id)
-                if carla_lights is not None:
-                    sumo_lights = BridgeHelper.get_sumo_lights_state(sumo_actor.signals,
+                current_signals = self.sumo.get_actor_signals(sumo_actor_id)
+                if carla_lights is not None and current_signals is not None:
+                    sumo_lights = BridgeHelper.get_sumo_lights_state(current_signals,
                                                                      carla_lights)
-                else:
-                    sumo_lights = None
-            else:
-                sumo_lights = None
 
-            self.sumo.synchronize_vehicle(sumo_actor_id, sumo_transform, sumo_lights)
+            sumo_actor_ids.append(sumo_actor_id)
+            sumo_signals.append(sumo_lights)
 
-        # Updates traffic lights in sumo based on carla information.
+        self.sumo.synchronize_vehicles(sumo_actor_ids, sumo_locations[valid],
+                                       sumo_rotations[valid], sumo_signals)
+
+        # Updates traffic lights in sumo based on carla information. Only transitions are sent.
         if self.tls_manager == 'carla':
             common_landmarks = self.sumo.traffic_light_ids & self.carla.traffic_light_ids
+            sumo_tl_states = {}
             for landmark_id in common_landmarks:
                 carla_tl_state = self.carla.get_traffic_light_state(landmark_id)
                 sumo_tl_state = BridgeHelper.get_sumo_traffic_light_state(carla_tl_state)
+                if self._tl_states.get(landmark_id) != sumo_tl_state:
+                    sumo_tl_states[landmark_id] = sumo_tl_state
 
-                # Updates all the sumo links related to this landmark.
-                self.sumo.synchronize_traffic_light(landmark_id, sumo_tl_state)
+            # Updates all the sumo links related to these landmarks.
+            self.tl_commands += self.sumo.synchronize_traffic_lights(sumo_tl_states)
+            self._tl_states.update(sumo_tl_states)
 
     def close(self):
         """
         Cleans synchronization.
         """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
         # Configuring carla simulation in async mode.
         settings = self.carla.world.get_settings()
         settings.synchronous_mode = False
@@ -220,12 +369,15 @@ def synchronization_loop(args):
     Entry point for sumo-carla co-simulation.
     """
     sumo_simulation = SumoSimulation(args.sumo_cfg_file, args.step_length, args.sumo_host,
-                                     args.sumo_port, args.sumo_gui, args.client_order)
+                                     args.sumo_port, args.sumo_gui, args.client_order,
+                                     args.sumo_backend)
     carla_simulation = CarlaSimulation(args.carla_host, args.carla_port, args.step_length)
 
     synchronization = SimulationSynchronization(sumo_simulation, carla_simulation, args.tls_manager,
-                                                args.sync_vehicle_color, args.sync_vehicle_lights)
+                                                args.sync_vehicle_color, args.sync_vehicle_lights,
+                                                args.scheduler)
     try:
+        last_report = time.time()
         while True:
             start = time.time()
 
@@ -233,9 +385,16 @@ def synchronization_loop(args):
 
             end = time.time()
             elapsed = end - start
+            synchronization.timings.record('step', elapsed)
             if elapsed < args.step_length:
                 time.sleep(args.step_length - elapsed)
 
+            if args.timing and end - last_report >= TIMING_REPORT_INTERVAL:
+                averages = synchronization.timings.pop_averages()
+                logging.info('Average phase times (ms): %s', ', '.join(
+                    '{}={:.2f}'.format(phase, value) for phase, value in sorted(averages.items())))
+                last_report = end
+
     except KeyboardInterrupt:
         logging.info('Cancelled by user.')
 
@@ -267,6 +426,13 @@ if __name__ == '__main__':
                            type=int,
                            help='TCP port to listen to (default: 8813)')
     argparser.add_argument('--sumo-gui', action='store_true', help='run the gui version of sumo')
+    argparser.add_argument('--sumo-backend',
+                           type=str,
+                           choices=['traci', 'libsumo'],
+                           default='traci',
+                           help='run sumo through traci sockets or in-process through libsumo; '
+                           'libsumo falls back to traci with --sumo-gui or --sumo-host/--sumo-port '
+                           '(default: traci)')
     argparser.add_argument('--step-length',
                            default=0.05,
                            type=float,
@@ -290,6 +456,15 @@ if __name__ == '__main__':
                            choices=['none', 'sumo', 'carla'],
                            help="select traffic light manager (default: none)",
                            default='none')
+    argparser.add_argument('--scheduler',
+                           type=str,
+                           choices=[LOCKSTEP, PIPELINED],
+                           default=LOCKSTEP,
+                           help='lockstep steps sumo and carla one after the other; pipelined '
+                           'steps them in parallel with a one step lag (default: lockstep)')
+    argparser.add_argument('--timing',
+                           action='store_true',
+                           help='log the average time of each synchronization phase every 10s')
     argparser.add_argument('--debug', action='store_true', help='enable debug messages')
     arguments = argparser.parse_args()
 
@@ -37,15 +37,14 @@ else:
 # -- imports ---------------------------------------------------------------------------------------
 # ==================================================================================================
 
-import sumolib  # pylint: disable=wrong-import-position
-import traci  # pylint: disable=wrong-import-position
-
 from sumo_integration.carla_simulation import CarlaSimulation  # pylint: disable=wrong-import-position
+from sumo_integration.routing import DEFAULT_ROUTE_LENGTH, RouteManager, RoutingGraph  # pylint: disable=wrong-import-position
+from sumo_integration.sumo_backend import TRACI, traci  # pylint: disable=wrong-import-position
 from sumo_integration.sumo_simulation import SumoSimulation  # pylint: disable=wrong-import-position
 
-from run_synchronization import SimulationSynchronization  # pylint: disable=wrong-import-position
+from run_synchronization import LOCKSTEP, PIPELINED, SimulationSynchronization  # pylint: disable=wrong-import-position
 
-from util.netconvert_carla import netconvert_carla
+from util.netconvert_carla import DEFAULT_CACHE_DIR, NetconvertCache, netconvert_carla
 
 # ==================================================================================================
 # -- main ------------------------------------------------------------------------------------------
@@ -90,8 +89,12 @@ def main(args):
     # ---------------
     # sumo simulation
     # ---------------
+    # The conversion of an already seen map is reused from the netconvert cache.
+    netconvert_cache = None
+    if not args.no_netconvert_cache:
+        netconvert_cache = NetconvertCache(args.netconvert_cache_dir)
     net_file = os.path.join(tmpdir, current_map.name + '.net.xml')
-    netconvert_carla(xodr_file, net_file, guess_tls=True)
+    netconvert_carla(xodr_file, net_file, guess_tls=True, cache=netconvert_cache)
 
     basedir = os.path.dirname(os.path.realpath(__file__))
     cfg_file = os.path.join(tmpdir, current_map.name + '.sumocfg')
@@ -99,19 +102,26 @@ def main(args):
     viewsettings_file = os.path.join(basedir, 'examples', 'viewsettings.xml')
     write_sumocfg_xml(cfg_file, net_file, vtypes_file, viewsettings_file, args.additional_traci_clients)
 
-    sumo_net = sumolib.net.readNet(net_file)
+    # Additional TraCI clients can only connect to a sumo server.
+    sumo_backend = args.sumo_backend
+    if args.additional_traci_clients > 0 and sumo_backend != TRACI:
+        logging.warning('Additional TraCI clients require the traci backend. Using TraCI.')
+        sumo_backend = TRACI
+
     sumo_simulation = SumoSimulation(cfg_file,
                                      args.step_length,
                                      host=args.sumo_host,
                                      port=args.sumo_port,
                                      sumo_gui=args.sumo_gui,
-                                     client_order=args.client_order)
+                                     client_order=args.client_order,
+                                     backend=sumo_backend)
 
     # ---------------
     # synchronization
     # ---------------
     synchronization = SimulationSynchronization(sumo_simulation, carla_simulation, args.tls_manager,
-                                                args.sync_vehicle_color, args.sync_vehicle_lights)
+                                                args.sync_vehicle_color, args.sync_vehicle_lights,
+                                                args.scheduler)
 
     try:
         # ----------
@@ -146,18 +156,17 @@ def main(args):
         # --------------
         # Spawn vehicles
         # --------------
-        # Spawns sumo NPC vehicles.
-        sumo_edges = sumo_net.getEdges()
+        # Spawns sumo NPC vehicles on random-walk routes. The allowed edges and the outgoing
+        # adjacency of each vehicle class are computed once.
+        route_manager = RouteManager(RoutingGraph(sumo_simulation.net), args.route_length)
 
         for i in range(args.number_of_vehicles):
             type_id = random.choice(blueprints)
             vclass = vtypes[type_id]['vClass']
 
-            allowed_edges = [e for e in sumo_edges if e.allows(vclass)]
-            if allowed_edges:
-                edge = random.choice(allowed_edges)
-
-                traci.route.add('route_{}'.format(i), [edge.getID()])
+            route = route_manager.random_route(vclass)
+            if route:
+                traci.route.add('route_{}'.format(i), route)
                 traci.vehicle.add('sumo_{}'.format(i), 'route_{}'.format(i), typeID=type_id)
             else:
                 logging.error(
@@ -169,20 +178,9 @@ def main(args):
 
             synchronization.tick()
 
-            # Updates vehicle routes
-            for vehicle_id in traci.vehicle.getIDList():
-                route = traci.vehicle.getRoute(vehicle_id)
-                index = traci.vehicle.getRouteIndex(vehicle_id)
-                vclass = traci.vehicle.getVehicleClass(vehicle_id)
-
-                if index == (len(route) - 1):
-                    current_edge = sumo_net.getEdge(route[index])
-                    available_edges = list(current_edge.getAllowedOutgoing(vclass).keys())
-                    if available_edges:
-                        next_edge = random.choice(available_edges)
-
-                        new_route = [current_edge.getID(), next_edge.getID()]
-                        traci.vehicle.setRoute(vehicle_id, new_route)
+            # Extends the routes of the vehicles that reached their last edge. Route progress is
+            # read from the sumo simulation subscription, so no request is sent per vehicle.
+            route_manager.update(sumo_simulation.get_vehicle_states())
 
             end = time.time()
             elapsed = end - start
@@ -231,6 +229,12 @@ if __name__ == '__main__':
                            default=0,
                            type=int,
                            help='number of walkers (default: 0)')
+    argparser.add_argument('--route-length',
+                           metavar='EDGES',
+                           default=DEFAULT_ROUTE_LENGTH,
+                           type=int,
+                           help='number of edges of the random routes assigned to the vehicles '
+                           '(default: {})'.format(DEFAULT_ROUTE_LENGTH))
     argparser.add_argument('--safe',
                            action='store_true',
                            help='avoid spawning vehicles prone to accidents')
@@ -243,6 +247,13 @@ if __name__ == '__main__':
                            default='walker.pedestrian.*',
                            help='pedestrians filter (default: "walker.pedestrian.*")')
     argparser.add_argument('--sumo-gui', action='store_true', help='run the gui version of sumo')
+    argparser.add_argument('--sumo-backend',
+                           type=str,
+                           choices=['traci', 'libsumo'],
+                           default='traci',
+                           help='run sumo through traci sockets or in-process through libsumo; '
+                           'libsumo falls back to traci with --sumo-gui or --sumo-host/--sumo-port '
+                           '(default: traci)')
     argparser.add_argument('--step-length',
                            default=0.05,
                            type=float,
@@ -271,6 +282,20 @@ if __name__ == '__main__':
                            choices=['none', 'sumo', 'carla'],
                            help="select traffic light manager (default: none)",
                            default='none')
+    argparser.add_argument('--scheduler',
+                           type=str,
+                           choices=[LOCKSTEP, PIPELINED],
+                           default=LOCKSTEP,
+                           help='lockstep steps sumo and carla one after the other; pipelined '
+                           'steps them in parallel with a one step lag (default: lockstep)')
+    argparser.add_argument('--netconvert-cache-dir',
+                           default=DEFAULT_CACHE_DIR,
+                           type=str,
+                           help='folder of the cached sumo nets (default: {})'.format(
+                               DEFAULT_CACHE_DIR))
+    argparser.add_argument('--no-netconvert-cache',
+                           action='store_true',
+                           help='always convert the carla map with netconvert (default: False)')
     argparser.add_argument('--debug', action='store_true', help='enable debug messages')
     args = argparser.parse_args()
 
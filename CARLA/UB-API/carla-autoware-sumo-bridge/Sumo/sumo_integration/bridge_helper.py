@@ -18,8 +18,9 @@ import os
 import random
 
 import carla  # pylint: disable=import-error
-import traci  # pylint: disable=import-error
+import numpy as np
 
+from .sumo_backend import traci
 from .sumo_simulation import SumoSignalState, SumoVehSignal
 
 # ==================================================================================================
@@ -40,6 +41,48 @@ class BridgeHelper(object):
     with open(_vtypes_path) as f:
         _VTYPES = json.load(f)['carla_blueprints']
 
+    # Lookup tables built once per session (see `clear_cache`).
+    _blueprints = None  # {type_id: blueprint}
+    _vclass_blueprints = None  # {vclass: [blueprint, ...]}
+    _sumo_vtypes = None  # set of vtypes known by sumo
+
+    @staticmethod
+    def clear_cache():
+        """
+        Clears the blueprint and vtype lookup tables. They are rebuilt on demand, so this has to be
+        called whenever the blueprint library or the sumo simulation changes.
+        """
+        BridgeHelper._blueprints = None
+        BridgeHelper._vclass_blueprints = None
+        BridgeHelper._sumo_vtypes = None
+
+    @staticmethod
+    def _get_blueprints():
+        """
+        Returns the carla blueprints indexed by type id.
+        """
+        if BridgeHelper._blueprints is None:
+            blueprints = {}
+            vclass_blueprints = {}
+            for blueprint in BridgeHelper.blueprint_library:
+                blueprints[blueprint.id] = blueprint
+                if blueprint.id in BridgeHelper._VTYPES:
+                    vclass = BridgeHelper._VTYPES[blueprint.id]['vClass']
+                    vclass_blueprints.setdefault(vclass, []).append(blueprint)
+
+            BridgeHelper._blueprints = blueprints
+            BridgeHelper._vclass_blueprints = vclass_blueprints
+        return BridgeHelper._blueprints
+
+    @staticmethod
+    def _get_sumo_vtypes():
+        """
+        Returns the set of vtypes known by sumo.
+        """
+        if BridgeHelper._sumo_vtypes is None:
+            BridgeHelper._sumo_vtypes = set(traci.vehicletype.getIDList())
+        return BridgeHelper._sumo_vtypes
+
     @staticmethod
     def get_carla_transform(in_sumo_transform, extent):
         """
@@ -95,6 +138,104 @@ class BridgeHelper(object):
 
         return out_transform
 
+    @staticmethod
+    def get_carla_transforms_array(locations, rotations, extents):
+        """
+        Vectorized version of `get_carla_transform` for several actors at once.
+
+            :param locations: (N, 3) array of sumo locations (x, y, z).
+            :param rotations: (N, 3) array of sumo rotations (pitch, yaw, roll) in degrees.
+            :param extents: (N, 3) array of actor extents (x, y, z).
+            :return: (locations, rotations) arrays in the carla reference system.
+        """
+        offset = BridgeHelper.offset
+        locations = np.asarray(locations, dtype=float).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=float).reshape(-1, 3)
+        extents = np.asarray(extents, dtype=float).reshape(-1, 3)
+
+        # From front-center-bumper to center (sumo reference system).
+        yaw = np.radians(-1 * rotations[:, 1] + 90)
+        pitch = np.radians(rotations[:, 0])
+        out_locations = np.empty_like(locations)
+        out_locations[:, 0] = locations[:, 0] - np.cos(yaw) * extents[:, 0] - offset[0]
+        out_locations[:, 1] = locations[:, 1] - np.sin(yaw) * extents[:, 0] - offset[1]
+        out_locations[:, 2] = locations[:, 2] - np.sin(pitch) * extents[:, 0]
+
+        # Transform to carla reference system (left-handed system).
+        out_locations[:, 1] *= -1
+        out_rotations = rotations.copy()
+        out_rotations[:, 1] -= 90
+
+        return out_locations, out_rotations
+
+    @staticmethod
+    def get_sumo_transforms_array(locations, rotations, extents):
+        """
+        Vectorized version of `get_sumo_transform` for several actors at once.
+
+            :param locations: (N, 3) array of carla locations (x, y, z).
+            :param rotations: (N, 3) array of carla rotations (pitch, yaw, roll) in degrees.
+            :param extents: (N, 3) array of actor extents (x, y, z).
+            :return: (locations, rotations) arrays in the sumo reference system.
+        """
+        offset = BridgeHelper.offset
+        locations = np.asarray(locations, dtype=float).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=float).reshape(-1, 3)
+        extents = np.asarray(extents, dtype=float).reshape(-1, 3)
+
+        # From center to front-center-bumper (carla reference system).
+        yaw = np.radians(-1 * rotations[:, 1])
+        pitch = np.radians(rotations[:, 0])
+        out_locations = np.empty_like(locations)
+        out_locations[:, 0] = locations[:, 0] + np.cos(yaw) * extents[:, 0] + offset[0]
+        out_locations[:, 1] = locations[:, 1] - np.sin(yaw) * extents[:, 0] - offset[1]
+        out_locations[:, 2] = locations[:, 2] - np.sin(pitch) * extents[:, 0]
+
+        # Transform to sumo reference system.
+        out_locations[:, 1] *= -1
+        out_rotations = rotations.copy()
+        out_rotations[:, 1] += 90
+
+        return out_locations, out_rotations
+
+    @staticmethod
+    def to_carla_transforms(locations, rotations):
+        """
+        Returns a list of carla transforms from (N, 3) location and rotation arrays, ready to be
+        used in batch commands.
+        """
+        return [
+            carla.Transform(carla.Location(x, y, z), carla.Rotation(pitch, yaw, roll))
+            for (x, y, z), (pitch, yaw, roll) in zip(locations.tolist(), rotations.tolist())
+        ]
+
+    @staticmethod
+    def get_carla_transforms(sumo_transforms, extents):
+        """
+        Returns the carla transforms of several actors based on their sumo transforms.
+        """
+        arrays = BridgeHelper._transforms_to_arrays(sumo_transforms, extents)
+        return BridgeHelper.to_carla_transforms(*BridgeHelper.get_carla_transforms_array(*arrays))
+
+    @staticmethod
+    def get_sumo_transforms(carla_transforms, extents):
+        """
+        Returns the sumo transforms of several actors based on their carla transforms.
+        """
+        arrays = BridgeHelper._transforms_to_arrays(carla_transforms, extents)
+        return BridgeHelper.to_carla_transforms(*BridgeHelper.get_sumo_transforms_array(*arrays))
+
+    @staticmethod
+    def _transforms_to_arrays(transforms, extents):
+        """
+        Returns (N, 3) location, rotation and extent arrays from lists of transforms and extents.
+        """
+        locations = [(t.location.x, t.location.y, t.location.z) for t in transforms]
+        rotations = [(t.rotation.pitch, t.rotation.yaw, t.rotation.roll) for t in transforms]
+        extents = [(e.x, e.y, e.z) for e in extents]
+        return (np.array(locations, dtype=float), np.array(rotations, dtype=float),
+                np.array(extents, dtype=float))
+
     @staticmethod
     def _get_recommended_carla_blueprint(sumo_actor):
         """
@@ -102,11 +243,8 @@ class BridgeHelper(object):
         """
         vclass = sumo_actor.vclass.value
 
-        blueprints = []
-        for blueprint in BridgeHelper.blueprint_library:
-            if blueprint.id in BridgeHelper._VTYPES and \
-               BridgeHelper._VTYPES[blueprint.id]['vClass'] == vclass:
-                blueprints.append(blueprint)
+        BridgeHelper._get_blueprints()
+        blueprints = BridgeHelper._vclass_blueprints.get(vclass, [])
 
         if not blueprints:
             return None
@@ -118,11 +256,11 @@ class BridgeHelper(object):
         """
         Returns an appropriate blueprint based on the received sumo actor.
         """
-        blueprint_library = BridgeHelper.blueprint_library
+        blueprints = BridgeHelper._get_blueprints()
         type_id = sumo_actor.type_id
 
-        if type_id in [bp.id for bp in blueprint_library]:
-            blueprint = blueprint_library.filter(type_id)[0]
+        if type_id in blueprints:
+            blueprint = blueprints[type_id]
             logging.debug('[BridgeHelper] sumo vtype %s found in carla blueprints', type_id)
         else:
             blueprint = BridgeHelper._get_recommended_carla_blueprint(sumo_actor)
@@ -166,10 +304,20 @@ class BridgeHelper(object):
         attrs = carla_actor.attributes
         extent = carla_actor.bounding_box.extent
 
-        if int(attrs['number_of_wheels']) == 2:
-            traci.vehicletype.copy('DEFAULT_BIKETYPE', type_id)
-        else:
-            traci.vehicletype.copy('DEFAULT_VEHTYPE', type_id)
+        try:
+            if int(attrs['number_of_wheels']) == 2:
+                traci.vehicletype.copy('DEFAULT_BIKETYPE', type_id)
+            else:
+                traci.vehicletype.copy('DEFAULT_VEHTYPE', type_id)
+        except traci.TraCIException:
+            # The vtype may have been created after the cache was built (e.g., by another client or
+            # a route file loaded later). In that case, refresh the cache and reuse it.
+            BridgeHelper._sumo_vtypes = set(traci.vehicletype.getIDList())
+            if type_id in BridgeHelper._sumo_vtypes:
+                logging.debug('[BridgeHelper] vtype %s already exists in sumo', type_id)
+                return type_id
+            raise
+        BridgeHelper._get_sumo_vtypes().add(type_id)
 
         if type_id in BridgeHelper._VTYPES:
             if 'vClass' in BridgeHelper._VTYPES[type_id]:
@@ -219,7 +367,7 @@ class BridgeHelper(object):
                 type_id)
             return None
 
-        if type_id in traci.vehicletype.getIDList():
+        if type_id in BridgeHelper._get_sumo_vtypes():
             logging.debug('[BridgeHelper] blueprint %s found in sumo vtypes', type_id)
             return type_id
         return BridgeHelper._create_sumo_vtype(carla_actor)
@@ -14,6 +14,7 @@
 import logging
 
 import carla  # pylint: disable=import-error
+import numpy as np
 
 from .constants import INVALID_ACTOR_ID, SPAWN_OFFSET_Z
 
@@ -34,11 +35,25 @@ class CarlaSimulation(object):
         self.blueprint_library = self.world.get_blueprint_library()
         self.step_length = step_length
 
+        # Actor handles, cached until the actor is destroyed.
+        self._actors = {}  # {actor_id: carla.Actor}
+
+        # Ids of all the actors in the last snapshot, and of the vehicles among them.
+        self._snapshot_actors = set()
+        self._vehicle_ids = set()
+        self.snapshot = None
+
+        # Bounding box extents of the vehicles, read once when they appear.
+        self._extents = {}  # {actor_id: (x, y, z)}
+
         # The following sets contain updated information for the current frame.
         self._active_actors = set()
         self.spawned_actors = set()
         self.destroyed_actors = set()
 
+        # Last light state applied to each synchronized vehicle.
+        self._light_states = {}  # {actor_id: carla.VehicleLightState}
+
         # Set traffic lights.
         self._tls = {}  # {landmark_id: traffic_ligth_actor}
 
@@ -54,8 +69,15 @@ class CarlaSimulation(object):
     def get_actor(self, actor_id):
         """
         Accessor for carla actor.
+
+        Actor handles are cached, so carla is only queried the first time an actor is requested.
         """
-        return self.world.get_actor(actor_id)
+        actor = self._actors.get(actor_id)
+        if actor is None:
+            actor = self.world.get_actor(actor_id)
+            if actor is not None:
+                self._actors[actor_id] = actor
+        return actor
 
     # This is a workaround to fix synchronization issues when other carla clients remove an actor in
     # carla without waiting for tick (e.g., running sumo co-simulation and manual control at the
@@ -72,6 +94,63 @@ class CarlaSimulation(object):
         except RuntimeError:
             return None
 
+    def get_vehicle_light_state(self, actor_id):
+        """
+        Accessor for the light state of a vehicle synchronized by this client.
+
+        The state is only queried from carla the first time; afterwards the last state sent through
+        `synchronize_vehicles` is returned. If the actor is not alive, returns None.
+        """
+        if actor_id not in self._light_states:
+            light_state = self.get_actor_light_state(actor_id)
+            if light_state is None:
+                return None
+            self._light_states[actor_id] = light_state
+        return self._light_states[actor_id]
+
+    def _cache_extent(self, actor):
+        """
+        Stores the bounding box extent of the given actor.
+        """
+        extent = actor.bounding_box.extent
+        self._extents[actor.id] = (extent.x, extent.y, extent.z)
+        return self._extents[actor.id]
+
+    def get_actor_poses(self, actor_ids):
+        """
+        Returns the poses of the given actors read from the snapshot of the last tick, decoded into
+        arrays ready to be used with the vectorized BridgeHelper transforms.
+
+            :param actor_ids: list of actor ids.
+            :return: (locations, rotations, extents) (N, 3) arrays. Rows of actors missing from the
+                snapshot are NaN.
+        """
+        locations = np.full((len(actor_ids), 3), np.nan)
+        rotations = np.full((len(actor_ids), 3), np.nan)
+        extents = np.full((len(actor_ids), 3), np.nan)
+        if self.snapshot is None:
+            return locations, rotations, extents
+
+        for index, actor_id in enumerate(actor_ids):
+            actor_snapshot = self.snapshot.find(actor_id)
+            if actor_snapshot is None:
+                continue
+
+            extent = self._extents.get(actor_id)
+            if extent is None:
+                actor = self.get_actor(actor_id)
+                if actor is None:
+                    continue
+                extent = self._cache_extent(actor)
+
+            transform = actor_snapshot.get_transform()
+            locations[index] = (transform.location.x, transform.location.y, transform.location.z)
+            rotations[index] = (transform.rotation.pitch, transform.rotation.yaw,
+                                transform.rotation.roll)
+            extents[index] = extent
+
+        return locations, rotations, extents
+
     @property
     def traffic_light_ids(self):
         return set(self._tls.keys())
@@ -123,7 +202,10 @@ class CarlaSimulation(object):
         """
         Destroys the given actor.
         """
-        actor = self.world.get_actor(actor_id)
+        self._light_states.pop(actor_id, None)
+        self._extents.pop(actor_id, None)
+        actor = self.get_actor(actor_id)
+        self._actors.pop(actor_id, None)
         if actor is not None:
             return actor.destroy()
         return False
@@ -137,7 +219,7 @@ class CarlaSimulation(object):
             :param lights: new vehicle light state.
             :return: True if successfully updated. Otherwise, False.
         """
-        vehicle = self.world.get_actor(vehicle_id)
+        vehicle = self.get_actor(vehicle_id)
         if vehicle is None:
             return False
 
@@ -146,6 +228,25 @@ class CarlaSimulation(object):
             vehicle.set_light_state(carla.VehicleLightState(lights))
         return True
 
+    def synchronize_vehicles(self, updates):
+        """
+        Updates the state of several vehicles with a single batch of commands.
+
+            :param updates: list of (vehicle_id, transform, lights) tuples. lights may be None.
+        """
+        batch = []
+        for vehicle_id, transform, lights in updates:
+            batch.append(carla.command.ApplyTransform(vehicle_id, transform))
+
+            # Light commands are only sent when the state actually changes.
+            if lights is not None and lights != self._light_states.get(vehicle_id):
+                lights = carla.VehicleLightState(lights)
+                batch.append(carla.command.SetVehicleLightState(vehicle_id, lights))
+                self._light_states[vehicle_id] = lights
+
+        if batch:
+            self.client.apply_batch(batch)
+
     def synchronize_traffic_light(self, landmark_id, state):
         """
         Updates traffic light state.
@@ -162,15 +263,60 @@ class CarlaSimulation(object):
         traffic_light.set_state(state)
         return True
 
+    def synchronize_traffic_lights(self, states):
+        """
+        Updates the state of several traffic lights. Landmarks sharing the same traffic light actor
+        result in a single command, and actors already in the requested state are skipped.
+
+            :param states: dict {landmark_id: new traffic light state}.
+            :return: number of commands sent to carla.
+        """
+        updates = {}  # {actor_id: (traffic_light, state)}
+        for landmark_id, state in states.items():
+            if landmark_id not in self._tls:
+                logging.warning('Landmark %s not found in carla', landmark_id)
+                continue
+
+            traffic_light = self._tls[landmark_id]
+            updates[traffic_light.id] = (traffic_light, state)
+
+        commands = 0
+        for traffic_light, state in updates.values():
+            if traffic_light.state != state:
+                traffic_light.set_state(state)
+                commands += 1
+        return commands
+
     def tick(self):
         """
         Tick to carla simulation.
         """
         self.world.tick()
-
-        # Update data structures for the current frame.
-        current_actors = set(
-            [vehicle.id for vehicle in self.world.get_actors().filter('vehicle.*')])
+        self.snapshot = self.world.get_snapshot()
+
+        # Update data structures for the current frame. Only the actors that appeared since the
+        # last frame are requested to carla (in a single call) to know whether they are vehicles.
+        snapshot_actors = set(actor_snapshot.id for actor_snapshot in self.snapshot)
+        new_actors = snapshot_actors.difference(self._snapshot_actors)
+        if new_actors:
+            for actor in self.world.get_actors(list(new_actors)):
+                new_actors.discard(actor.id)
+                if actor.type_id.startswith('vehicle.'):
+                    self._actors[actor.id] = actor
+                    self._vehicle_ids.add(actor.id)
+                    self._cache_extent(actor)
+
+            # Actors not yet known by this client are requested again in the next frame.
+            snapshot_actors.difference_update(new_actors)
+
+        for actor_id in self._snapshot_actors.difference(snapshot_actors):
+            self._actors.pop(actor_id, None)
+            self._light_states.pop(actor_id, None)
+            self._extents.pop(actor_id, None)
+            self._vehicle_ids.discard(actor_id)
+        self._snapshot_actors = snapshot_actors
+
+        current_actors = set(self._vehicle_ids)
         self.spawned_actors = current_actors.difference(self._active_actors)
         self.destroyed_actors = self._active_actors.difference(current_actors)
         self._active_actors = current_actors
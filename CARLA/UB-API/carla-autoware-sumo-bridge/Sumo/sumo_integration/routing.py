@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2025 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module provides random-walk routing for sumo NPC vehicles. """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import logging
+import random
+
+from .sumo_backend import traci
+
+# ==================================================================================================
+# -- routing graph ---------------------------------------------------------------------------------
+# ==================================================================================================
+
+DEFAULT_ROUTE_LENGTH = 10  # edges
+
+
+class RoutingGraph(object):
+    """
+    RoutingGraph holds, for each vehicle class, the edges allowed for that class and their allowed
+    outgoing edges. Each vehicle class is computed once from the sumo net the first time it is
+    requested.
+    """
+    def __init__(self, net):
+        self._edges = {edge.getID(): edge for edge in net.getEdges()}
+        self._allowed_edges = {}  # {vclass: [edge_id, ...]}
+        self._successors = {}  # {vclass: {edge_id: [edge_id, ...]}}
+
+    def _build(self, vclass):
+        """
+        Computes the allowed edges and the outgoing adjacency for the given vehicle class.
+        """
+        allowed_edges = [edge_id for edge_id, edge in self._edges.items() if edge.allows(vclass)]
+        successors = {}
+        for edge_id in allowed_edges:
+            outgoing = self._edges[edge_id].getAllowedOutgoing(vclass)
+            successors[edge_id] = [edge.getID() for edge in outgoing]
+
+        self._allowed_edges[vclass] = allowed_edges
+        self._successors[vclass] = successors
+        logging.debug('Routing graph for %s: %d edges', vclass, len(allowed_edges))
+
+    def get_allowed_edges(self, vclass):
+        """
+        Returns the ids of the edges allowed for the given vehicle class.
+        """
+        if vclass not in self._allowed_edges:
+            self._build(vclass)
+        return self._allowed_edges[vclass]
+
+    def get_successors(self, vclass, edge_id):
+        """
+        Returns the ids of the allowed outgoing edges of the given edge.
+        """
+        if vclass not in self._successors:
+            self._build(vclass)
+        return self._successors[vclass].get(edge_id, [])
+
+    def random_walk(self, vclass, start_edge=None, length=DEFAULT_ROUTE_LENGTH, rng=random):
+        """
+        Returns a random-walk route of up to `length` edges. If `start_edge` is not given, a random
+        allowed edge is used. The walk stops early at dead ends.
+
+            :return: list of edge ids, empty if the vehicle class has no allowed edges.
+        """
+        if start_edge is None:
+            allowed_edges = self.get_allowed_edges(vclass)
+            if not allowed_edges:
+                return []
+            start_edge = rng.choice(allowed_edges)
+
+        route = [start_edge]
+        while len(route) < length:
+            successors = self.get_successors(vclass, route[-1])
+            if not successors:
+                break
+            route.append(rng.choice(successors))
+        return route
+
+
+# ==================================================================================================
+# -- route manager ---------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class RouteManager(object):
+    """
+    RouteManager extends the routes of the vehicles that reach the last edge of their route. Route
+    progress is read from the vehicle subscription results, so no request is sent to sumo for
+    vehicles that still have edges ahead.
+    """
+    def __init__(self, routing_graph, route_length=DEFAULT_ROUTE_LENGTH, rng=random):
+        self.routing_graph = routing_graph
+        self.route_length = route_length
+        self._rng = rng
+
+    def random_route(self, vclass):
+        """
+        Returns a new random-walk route for the given vehicle class.
+        """
+        return self.routing_graph.random_walk(vclass, length=self.route_length, rng=self._rng)
+
+    def update(self, vehicle_states):
+        """
+        Extends the route of the vehicles driving on the last edge of their route.
+
+            :param vehicle_states: dict {vehicle_id: {variable: value}} with the route edges, route
+                index and vehicle class of each vehicle.
+            :return: number of extended routes.
+        """
+        extended = 0
+        for vehicle_id, results in vehicle_states.items():
+            route = results[traci.constants.VAR_EDGES]
+            index = results[traci.constants.VAR_ROUTE_INDEX]
+            if index != len(route) - 1:
+                continue
+
+            vclass = results[traci.constants.VAR_VEHICLECLASS]
+            new_route = self.routing_graph.random_walk(vclass, route[index], self.route_length,
+                                                       self._rng)
+            if len(new_route) > 1:
+                traci.vehicle.setRoute(vehicle_id, new_route)
+                extended += 1
+        return extended
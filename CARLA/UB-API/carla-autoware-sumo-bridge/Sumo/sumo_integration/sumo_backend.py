@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2025 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+""" This module selects the library used to talk to sumo (TraCI sockets or in-process libsumo). """
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import logging
+
+import traci as _traci  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- sumo backend ----------------------------------------------------------------------------------
+# ==================================================================================================
+
+TRACI = 'traci'
+LIBSUMO = 'libsumo'
+BACKENDS = (TRACI, LIBSUMO)
+
+
+class SumoBackend(object):
+    """
+    SumoBackend forwards every attribute to the selected sumo client library. libsumo exposes the
+    same API as traci, so the rest of the co-simulation uses this object as the `traci` module.
+    """
+    def __init__(self):
+        self.name = TRACI
+        self._module = _traci
+
+    def __getattr__(self, name):
+        # Constants are shared by both libraries.
+        if name == 'constants':
+            return _traci.constants
+        return getattr(self._module, name)
+
+    def select(self, name, sumo_gui=False, remote=False):
+        """
+        Selects the sumo client library. libsumo runs sumo in-process and therefore does not
+        support the gui nor connecting to a running sumo server; in those cases, or if libsumo is
+        not installed, TraCI is used instead.
+
+            :param name: 'traci' or 'libsumo'.
+            :param sumo_gui: whether the gui version of sumo is requested.
+            :param remote: whether the connection is to an already running sumo server.
+            :return: name of the selected backend.
+        """
+        if name not in BACKENDS:
+            raise ValueError('Unknown sumo backend: {}'.format(name))
+
+        self.name, self._module = TRACI, _traci
+        if name == LIBSUMO:
+            if sumo_gui or remote:
+                logging.warning('libsumo does not support the sumo gui nor remote sumo servers. '
+                                'Falling back to TraCI.')
+            else:
+                try:
+                    import libsumo  # pylint: disable=import-error, import-outside-toplevel
+                    self.name, self._module = LIBSUMO, libsumo
+                except ImportError:
+                    logging.warning('libsumo is not available. Falling back to TraCI.')
+
+        logging.info('Using %s sumo backend.', self.name)
+        return self.name
+
+    @property
+    def is_libsumo(self):
+        return self.name == LIBSUMO
+
+
+traci = SumoBackend()
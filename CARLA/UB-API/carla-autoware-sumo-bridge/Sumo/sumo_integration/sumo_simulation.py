@@ -17,10 +17,11 @@ import logging
 import os
 
 import carla  # pylint: disable=import-error
+import numpy as np
 import sumolib  # pylint: disable=import-error
-import traci  # pylint: disable=import-error
 
 from .constants import INVALID_ACTOR_ID
+from .sumo_backend import TRACI, traci
 
 import lxml.etree as ET  # pylint: disable=import-error
 
@@ -101,6 +102,15 @@ class SumoActorClass(enum.Enum):
 
 SumoActor = collections.namedtuple('SumoActor', 'type_id vclass transform signals extent color')
 
+# Vehicle variables retrieved every step for all the vehicles in the simulation.
+VEHICLE_VARIABLES = [
+    traci.constants.VAR_TYPE, traci.constants.VAR_VEHICLECLASS, traci.constants.VAR_COLOR,
+    traci.constants.VAR_LENGTH, traci.constants.VAR_WIDTH, traci.constants.VAR_HEIGHT,
+    traci.constants.VAR_POSITION3D, traci.constants.VAR_ANGLE, traci.constants.VAR_SLOPE,
+    traci.constants.VAR_SPEED, traci.constants.VAR_SPEED_LAT, traci.constants.VAR_SIGNALS,
+    traci.constants.VAR_EDGES, traci.constants.VAR_ROUTE_INDEX
+]
+
 # ==================================================================================================
 # -- sumo traffic lights ---------------------------------------------------------------------------
 # ==================================================================================================
@@ -158,11 +168,16 @@ class SumoTLManager(object):
     """
     SumoTLManager is responsible for the management of the sumo traffic lights (i.e., keeps control
     of the current program, phase, ...)
+
+    The signals associated with each landmark are indexed for the current programs, and the index
+    is only rebuilt when a traffic light switches program. At each tick, the landmarks whose
+    traffic light changed of phase are stored in `changed_landmarks`.
     """
     def __init__(self):
         self._tls = {}  # {tlid: {program_id: SumoTLLogic}
         self._current_program = {}  # {tlid: program_id}
         self._current_phase = {}  # {tlid: index_phase}
+        self._current_state = {}  # {tlid: state of the current phase (e.g., 'rrGG')}
 
         for tlid in traci.trafficlight.getIDList():
             self.subscribe(tlid)
@@ -177,9 +192,45 @@ class SumoTLManager(object):
             # Get current status of the traffic lights.
             self._current_program[tlid] = traci.trafficlight.getProgram(tlid)
             self._current_phase[tlid] = traci.trafficlight.getPhase(tlid)
+            self._current_state[tlid] = self._get_phase_state(tlid)
+
+        self._landmark2signals = {}  # {landmark_id: [(tlid, link_index), ...]}
+        self._tlid2landmarks = {}  # {tlid: {landmark_id: [link_index, ...]}}
+        self._build_index()
+
+        # Landmarks whose state may have changed during the last tick. All of them are reported
+        # after the first tick.
+        self.changed_landmarks = self.get_all_landmarks()
+        self._report_all_landmarks = True
 
         self._off = False
 
+    def _get_phase_state(self, tlid):
+        """
+        Returns the state of the current phase of the given traffic light.
+        """
+        tl = self._tls[tlid].get(self._current_program[tlid])
+        if tl is None or not tl.states:
+            return ''
+        return tl.states[self._current_phase[tlid]]
+
+    def _build_index(self):
+        """
+        Builds the landmark to signals index for the current programs.
+        """
+        self._landmark2signals = {}
+        self._tlid2landmarks = {}
+        for tlid, program_id in self._current_program.items():
+            tl = self._tls[tlid].get(program_id)
+            if tl is None:
+                continue
+
+            self._tlid2landmarks[tlid] = {}
+            for landmark_id in tl.get_all_landmarks():
+                signals = tl.get_associated_signals(landmark_id)
+                self._landmark2signals.setdefault(landmark_id, []).extend(signals)
+                self._tlid2landmarks[tlid][landmark_id] = [link_index for _, link_index in signals]
+
     @staticmethod
     def subscribe(tlid):
         """
@@ -213,32 +264,22 @@ class SumoTLManager(object):
         """
         Returns all the landmarks associated with a traffic light in the simulation.
         """
-        landmarks = set()
-        for tlid, program_id in self._current_program.items():
-            landmarks.update(self._tls[tlid][program_id].get_all_landmarks())
-        return landmarks
+        return set(self._landmark2signals.keys())
 
     def get_all_associated_signals(self, landmark_id):
         """
         Returns all the signals associated with the given landmark.
             :returns list: [(tlid, link_index), (tlid, link_index), ...]
         """
-        signals = set()
-        for tlid, program_id in self._current_program.items():
-            signals.update(self._tls[tlid][program_id].get_associated_signals(landmark_id))
-        return signals
+        return set(self._landmark2signals.get(landmark_id, []))
 
     def get_state(self, landmark_id):
         """
         Returns the traffic light state of the signals associated with the given landmark.
         """
         states = set()
-        for tlid, link_index in self.get_all_associated_signals(landmark_id):
-            current_program = self._current_program[tlid]
-            current_phase = self._current_phase[tlid]
-
-            tl = self._tls[tlid][current_program]
-            states.update(tl.states[current_phase][link_index])
+        for tlid, link_index in self._landmark2signals.get(landmark_id, []):
+            states.add(self._current_state[tlid][link_index])
 
         if len(states) == 1:
             return states.pop()
@@ -253,31 +294,86 @@ class SumoTLManager(object):
         """
         Updates the state of all the signals associated with the given landmark.
         """
-        for tlid, link_index in self.get_all_associated_signals(landmark_id):
+        for tlid, link_index in self._landmark2signals.get(landmark_id, []):
             traci.trafficlight.setLinkState(tlid, link_index, state)
         return True
 
+    def set_states(self, states):
+        """
+        Updates the state of the signals associated with several landmarks. Each traffic light
+        whose state changes receives a single setRedYellowGreenState command.
+
+            :param states: dict {landmark_id: new signal state}.
+            :return: number of commands sent to sumo.
+        """
+        new_states = {}  # {tlid: [signal state, ...]}
+        for landmark_id, state in states.items():
+            for tlid, link_index in self._landmark2signals.get(landmark_id, []):
+                if tlid not in new_states:
+                    new_states[tlid] = list(self._current_state[tlid])
+                if link_index < len(new_states[tlid]):
+                    new_states[tlid][link_index] = state
+
+        commands = 0
+        for tlid, new_state in new_states.items():
+            new_state = ''.join(new_state)
+            if new_state != self._current_state[tlid]:
+                traci.trafficlight.setRedYellowGreenState(tlid, new_state)
+                self._current_state[tlid] = new_state
+                commands += 1
+        return commands
+
     def switch_off(self):
         """
         Switch off all traffic lights.
         """
-        for tlid, link_index in self.get_all_signals():
-            traci.trafficlight.setLinkState(tlid, link_index, SumoSignalState.OFF)
+        for tlid in self._current_program:
+            tl = self._tls[tlid].get(self._current_program[tlid])
+            if tl is None:
+                continue
+
+            off_state = SumoSignalState.OFF * tl.get_number_signals()
+            traci.trafficlight.setRedYellowGreenState(tlid, off_state)
+            self._current_state[tlid] = off_state
         self._off = True
 
     def tick(self):
         """
         Tick to traffic light manager
         """
+        self.changed_landmarks = set()
         if self._off is False:
+            program_switched = False
             for tl_id in traci.trafficlight.getIDList():
                 results = traci.trafficlight.getSubscriptionResults(tl_id)
                 current_program = results[traci.constants.TL_CURRENT_PROGRAM]
                 current_phase = results[traci.constants.TL_CURRENT_PHASE]
 
-                if current_program != 'online':
-                    self._current_program[tl_id] = current_program
-                    self._current_phase[tl_id] = current_phase
+                if current_program == 'online':
+                    continue
+
+                if current_program != self._current_program[tl_id]:
+                    program_switched = True
+                elif current_phase == self._current_phase[tl_id]:
+                    continue
+
+                self._current_program[tl_id] = current_program
+                self._current_phase[tl_id] = current_phase
+
+                previous_state = self._current_state[tl_id]
+                state = self._get_phase_state(tl_id)
+                self._current_state[tl_id] = state
+                for landmark_id, link_indices in self._tlid2landmarks.get(tl_id, {}).items():
+                    if any(previous_state[i:i + 1] != state[i:i + 1] for i in link_indices):
+                        self.changed_landmarks.add(landmark_id)
+
+            if program_switched:
+                self._build_index()
+                self._report_all_landmarks = True
+
+        if self._report_all_landmarks:
+            self.changed_landmarks = self.get_all_landmarks()
+            self._report_all_landmarks = False
 
 
 # ==================================================================================================
@@ -319,13 +415,23 @@ class SumoSimulation(object):
     """
     SumoSimulation is responsible for the management of the sumo simulation.
     """
-    def __init__(self, cfg_file, step_length, host=None, port=None, sumo_gui=False, client_order=1):
+    def __init__(self,
+                 cfg_file,
+                 step_length,
+                 host=None,
+                 port=None,
+                 sumo_gui=False,
+                 client_order=1,
+                 backend=TRACI):
+        remote = host is not None and port is not None
+        self.backend = traci.select(backend, sumo_gui=sumo_gui, remote=remote)
+
         if sumo_gui is True:
             sumo_binary = sumolib.checkBinary('sumo-gui')
         else:
             sumo_binary = sumolib.checkBinary('sumo')
 
-        if host is None or port is None:
+        if not remote:
             logging.info('Starting new sumo server...')
             sumo_cmd = [sumo_binary,
                 '--configuration-file', cfg_file,
@@ -347,7 +453,8 @@ class SumoSimulation(object):
             logging.info('Connection to sumo server. Host: %s Port: %s', host, port)
             traci.init(host=host, port=port)
 
-        traci.setOrder(client_order)
+        if not traci.is_libsumo:
+            traci.setOrder(client_order)
 
         # Retrieving net from configuration file.
         self.net = _get_sumo_net(cfg_file)
@@ -365,12 +472,46 @@ class SumoSimulation(object):
         # Traffic light manager.
         self.traffic_light_manager = SumoTLManager()
 
+        # State of all the vehicles in the simulation for the current step.
+        self._vehicle_states = {}  # {actor_id: {variable: value}}
+        self._context_junction = self._subscribe_all_vehicles()
+
     @property
     def traffic_light_ids(self):
         return self.traffic_light_manager.get_all_landmarks()
 
+    @property
+    def changed_traffic_light_ids(self):
+        """
+        Landmarks whose traffic light state may have changed during the last tick.
+        """
+        return self.traffic_light_manager.changed_landmarks
+
     @staticmethod
-    def subscribe(actor_id):
+    def _subscribe_all_vehicles():
+        """
+        Subscribes to the state of all the vehicles in the simulation with a single context
+        subscription around a junction whose range covers the whole net. This way, the state of
+        every vehicle arrives with the simulation step response instead of requiring one
+        subscription per vehicle.
+
+            :return: id of the junction holding the subscription, or None if the net does not have
+                any junction.
+        """
+        junction_ids = traci.junction.getIDList()
+        if not junction_ids:
+            logging.warning('No junction found in sumo. Vehicles will be subscribed one by one.')
+            return None
+
+        (x_min, y_min), (x_max, y_max) = traci.simulation.getNetBoundary()
+        net_range = 2.0 * ((x_max - x_min)**2 + (y_max - y_min)**2)**0.5 + 1.0
+
+        junction_id = junction_ids[0]
+        traci.junction.subscribeContext(junction_id, traci.constants.CMD_GET_VEHICLE_VARIABLE,
+                                        net_range, VEHICLE_VARIABLES)
+        return junction_id
+
+    def subscribe(self, actor_id):
         """
         Subscribe the given actor to the following variables:
 
@@ -383,20 +524,29 @@ class SumoSimulation(object):
             * Speed.
             * Lateral speed.
             * Signals.
+            * Route edges and route index.
+
+        Nothing is done when all the vehicles are already retrieved through the context
+        subscription.
         """
-        traci.vehicle.subscribe(actor_id, [
-            traci.constants.VAR_TYPE, traci.constants.VAR_VEHICLECLASS, traci.constants.VAR_COLOR,
-            traci.constants.VAR_LENGTH, traci.constants.VAR_WIDTH, traci.constants.VAR_HEIGHT,
-            traci.constants.VAR_POSITION3D, traci.constants.VAR_ANGLE, traci.constants.VAR_SLOPE,
-            traci.constants.VAR_SPEED, traci.constants.VAR_SPEED_LAT, traci.constants.VAR_SIGNALS
-        ])
+        if self._context_junction is None:
+            traci.vehicle.subscribe(actor_id, VEHICLE_VARIABLES)
 
-    @staticmethod
-    def unsubscribe(actor_id):
+    def unsubscribe(self, actor_id):
         """
         Unsubscribe the given actor from receiving updated information each step.
         """
-        traci.vehicle.unsubscribe(actor_id)
+        if self._context_junction is None:
+            traci.vehicle.unsubscribe(actor_id)
+
+    def get_vehicle_states(self):
+        """
+        Returns the subscribed variables of all the vehicles for the current step.
+            :returns dict: {actor_id: {variable: value}}
+        """
+        if self._context_junction is None:
+            return traci.vehicle.getAllSubscriptionResults()
+        return self._vehicle_states
 
     def get_net_offset(self):
         """
@@ -406,12 +556,24 @@ class SumoSimulation(object):
             return (0, 0)
         return self.net.getLocationOffset()
 
-    @staticmethod
-    def get_actor(actor_id):
+    def _get_results(self, actor_id):
         """
-        Accessor for sumo actor.
+        Returns the subscribed variables of the given actor, or None if sumo did not report them in
+        the current step. With the context subscription, vehicles that are not on a lane (e.g.,
+        teleporting, parked off-lane or not inserted yet) are not reported.
         """
-        results = traci.vehicle.getSubscriptionResults(actor_id)
+        results = self._vehicle_states.get(actor_id)
+        if results is None:
+            results = traci.vehicle.getSubscriptionResults(actor_id)
+        return results or None
+
+    def get_actor(self, actor_id):
+        """
+        Accessor for sumo actor. Returns None if sumo did not report the actor in the current step.
+        """
+        results = self._get_results(actor_id)
+        if results is None:
+            return None
 
         type_id = results[traci.constants.VAR_TYPE]
         vclass = SumoActorClass(results[traci.constants.VAR_VEHICLECLASS])
@@ -431,6 +593,38 @@ class SumoSimulation(object):
 
         return SumoActor(type_id, vclass, transform, signals, extent, color)
 
+    def get_actor_poses(self, actor_ids):
+        """
+        Returns the poses of the given actors decoded into arrays, ready to be used with the
+        vectorized BridgeHelper transforms.
+
+            :param actor_ids: list of actor ids.
+            :return: (locations, rotations, extents, signals). The first three are (N, 3) arrays
+                (x, y, z), (pitch, yaw, roll) and half (length, width, height); signals is a list.
+                Rows of actors not reported by sumo in the current step are NaN and their signals
+                None.
+        """
+        locations = np.full((len(actor_ids), 3), np.nan)
+        rotations = np.full((len(actor_ids), 3), np.nan)
+        extents = np.full((len(actor_ids), 3), np.nan)
+        signals = []
+        for index, actor_id in enumerate(actor_ids):
+            results = self._get_results(actor_id)
+            if results is None:
+                signals.append(None)
+                continue
+
+            locations[index] = results[traci.constants.VAR_POSITION3D]
+            rotations[index, 0] = results[traci.constants.VAR_SLOPE]
+            rotations[index, 1] = results[traci.constants.VAR_ANGLE]
+            rotations[index, 2] = 0.0
+            extents[index] = (results[traci.constants.VAR_LENGTH],
+                              results[traci.constants.VAR_WIDTH],
+                              results[traci.constants.VAR_HEIGHT])
+            signals.append(results[traci.constants.VAR_SIGNALS])
+
+        return locations, rotations, extents / 2.0, signals
+
     def spawn_actor(self, type_id, color=None):
         """
         Spawns a new actor.
@@ -455,7 +649,7 @@ class SumoSimulation(object):
                     return INVALID_ACTOR_ID
 
             traci.vehicle.add(actor_id, 'carla_route_{}'.format(vclass), typeID=type_id)
-        except traci.exceptions.TraCIException as error:
+        except traci.TraCIException as error:
             logging.error('Spawn sumo actor failed: %s', error)
             return INVALID_ACTOR_ID
 
@@ -505,6 +699,41 @@ class SumoSimulation(object):
             traci.vehicle.setSignals(vehicle_id, signals)
         return True
 
+    def synchronize_vehicles(self, vehicle_ids, locations, rotations, signals):
+        """
+        Updates the state of several vehicles. Signals are only sent when they differ from the
+        ones reported by sumo in the current step.
+
+            :param vehicle_ids: list of actor ids to be updated.
+            :param locations: (N, 3) array of sumo locations.
+            :param rotations: (N, 3) array of sumo rotations (pitch, yaw, roll).
+            :param signals: list of new vehicle signals (None to keep the current ones).
+        """
+        for vehicle_id, location, rotation, vehicle_signals in zip(vehicle_ids, locations.tolist(),
+                                                                    rotations.tolist(), signals):
+            traci.vehicle.moveToXY(vehicle_id,
+                                   "",
+                                   0,
+                                   location[0],
+                                   location[1],
+                                   angle=rotation[1],
+                                   keepRoute=2)
+
+            if vehicle_signals is not None:
+                results = self._vehicle_states.get(vehicle_id)
+                if results is None or results[traci.constants.VAR_SIGNALS] != vehicle_signals:
+                    traci.vehicle.setSignals(vehicle_id, vehicle_signals)
+
+    def get_actor_signals(self, actor_id):
+        """
+        Returns the signals of the given actor in the current step, or None if sumo did not report
+        them (e.g., the vehicle has not been inserted yet).
+        """
+        results = self._get_results(actor_id)
+        if results is None:
+            return None
+        return results.get(traci.constants.VAR_SIGNALS)
+
     def synchronize_traffic_light(self, landmark_id, state):
         """
         Updates traffic light state.
@@ -515,6 +744,15 @@ class SumoSimulation(object):
         """
         self.traffic_light_manager.set_state(landmark_id, state)
 
+    def synchronize_traffic_lights(self, states):
+        """
+        Updates the state of several traffic lights.
+
+            :param states: dict {landmark_id: new traffic light state}.
+            :return: number of commands sent to sumo.
+        """
+        return self.traffic_light_manager.set_states(states)
+
     def tick(self):
         """
         Tick to sumo simulation.
@@ -522,6 +760,10 @@ class SumoSimulation(object):
         traci.simulationStep()
         self.traffic_light_manager.tick()
 
+        if self._context_junction is not None:
+            self._vehicle_states = traci.junction.getContextSubscriptionResults(
+                self._context_junction) or {}
+
         # Update data structures for the current frame.
         self.spawned_actors = set(traci.simulation.getDepartedIDList())
         self.destroyed_actors = set(traci.simulation.getArrivedIDList())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2025 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Script to check the vectorized BridgeHelper transforms against the scalar ones and to measure the
+conversion time of a co-simulation step.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+# ==================================================================================================
+# -- find traci module -----------------------------------------------------------------------------
+# ==================================================================================================
+
+if 'SUMO_HOME' in os.environ:
+    sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+# ==================================================================================================
+# -- sumo integration imports ----------------------------------------------------------------------
+# ==================================================================================================
+
+import carla  # pylint: disable=import-error, wrong-import-position
+
+from sumo_integration.bridge_helper import BridgeHelper  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def random_actors(num_actors, seed=0):
+    """
+    Returns random transforms and extents for the given number of actors.
+    """
+    rng = np.random.default_rng(seed)
+    locations = rng.uniform(-500.0, 500.0, (num_actors, 3))
+    rotations = rng.uniform(-180.0, 180.0, (num_actors, 3))
+    extents = rng.uniform(0.5, 3.0, (num_actors, 3))
+
+    transforms = BridgeHelper.to_carla_transforms(locations, rotations)
+    extents = [carla.Vector3D(x, y, z) for x, y, z in extents.tolist()]
+    return transforms, extents
+
+
+def _max_error(transforms, expected_transforms):
+    """
+    Returns the largest location and rotation difference between two lists of transforms.
+    """
+    max_location, max_rotation = 0.0, 0.0
+    for transform, expected in zip(transforms, expected_transforms):
+        max_location = max(max_location, transform.location.distance(expected.location))
+        max_rotation = max(max_rotation, abs(transform.rotation.pitch - expected.rotation.pitch),
+                           abs(transform.rotation.yaw - expected.rotation.yaw),
+                           abs(transform.rotation.roll - expected.rotation.roll))
+    return max_location, max_rotation
+
+
+def check_equivalence(transforms, extents, tolerance):
+    """
+    Checks that the vectorized transforms match the scalar ones. Returns True on success.
+    """
+    success = True
+    for name, scalar, vectorized in (
+        ('sumo->carla', BridgeHelper.get_carla_transform, BridgeHelper.get_carla_transforms),
+        ('carla->sumo', BridgeHelper.get_sumo_transform, BridgeHelper.get_sumo_transforms),
+    ):
+        expected = [scalar(transform, extent) for transform, extent in zip(transforms, extents)]
+        max_location, max_rotation = _max_error(vectorized(transforms, extents), expected)
+
+        passed = max_location <= tolerance and max_rotation <= tolerance
+        success = success and passed
+        print('{:<12} max location error: {:.3e} m, max rotation error: {:.3e} deg [{}]'.format(
+            name, max_location, max_rotation, 'ok' if passed else 'FAILED'))
+    return success
+
+
+def benchmark(transforms, extents, repeat):
+    """
+    Prints the time needed to convert all the given actors with the scalar and vectorized paths.
+    """
+    def scalar():
+        return [
+            BridgeHelper.get_carla_transform(transform, extent)
+            for transform, extent in zip(transforms, extents)
+        ]
+
+    def vectorized():
+        return BridgeHelper.get_carla_transforms(transforms, extents)
+
+    locations = np.array([(t.location.x, t.location.y, t.location.z) for t in transforms])
+    rotations = np.array([(t.rotation.pitch, t.rotation.yaw, t.rotation.roll) for t in transforms])
+    extents_array = np.array([(e.x, e.y, e.z) for e in extents])
+
+    def vectorized_array():
+        return BridgeHelper.get_carla_transforms_array(locations, rotations, extents_array)
+
+    print('sumo->carla conversion of {} actors (best of {}):'.format(len(transforms), repeat))
+    for name, function in (('scalar', scalar), ('vectorized', vectorized),
+                           ('arrays only', vectorized_array)):
+        elapsed = min(timeit.repeat(function, number=1, repeat=repeat))
+        print('  {:<12} {:8.3f} ms'.format(name, elapsed * 1000.0))
+
+
+def main(args):
+    """
+    Runs the equivalence check and the benchmark.
+    """
+    BridgeHelper.offset = (args.offset_x, args.offset_y)
+
+    transforms, extents = random_actors(args.actors)
+    success = check_equivalence(transforms, extents, args.tolerance)
+    benchmark(transforms, extents, args.repeat)
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('--actors',
+                           default=1000,
+                           type=int,
+                           help='number of actors converted per step (default: 1000)')
+    argparser.add_argument('--repeat',
+                           default=20,
+                           type=int,
+                           help='number of timed repetitions (default: 20)')
+    argparser.add_argument('--tolerance',
+                           default=1e-3,
+                           type=float,
+                           help='maximum allowed difference with the scalar path (default: 1e-3)')
+    argparser.add_argument('--offset-x',
+                           default=100.0,
+                           type=float,
+                           help='sumo net offset in x used for the check (default: 100.0)')
+    argparser.add_argument('--offset-y',
+                           default=-50.0,
+                           type=float,
+                           help='sumo net offset in y used for the check (default: -50.0)')
+    arguments = argparser.parse_args()
+
+    sys.exit(main(arguments))
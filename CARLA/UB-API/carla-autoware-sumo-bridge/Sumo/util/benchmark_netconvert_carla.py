@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2025 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Script to measure the time spent in each phase of netconvert_carla for an opendrive file. The
+topology lookups are also compared against the previous implementation (all-pairs connection scan
+and sorting the lane sections on every query).
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import bisect
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# ==================================================================================================
+# -- find sumo modules -----------------------------------------------------------------------------
+# ==================================================================================================
+
+if 'SUMO_HOME' in os.environ:
+    sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+BASEDIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.append(BASEDIR)
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import carla  # pylint: disable=wrong-import-position
+import sumolib  # pylint: disable=wrong-import-position
+
+from util.netconvert_carla import _start_netconvert, build_topology, build_traffic_lights, insert_traffic_lights, netconvert_carla  # pylint: disable=wrong-import-position, protected-access
+
+# ==================================================================================================
+# -- previous lookups ------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def legacy_connections(sumo_net):
+    """
+    Counts the connections of the net visiting every pair of edges.
+    """
+    count = 0
+    for from_edge in sumo_net.getEdges():
+        for to_edge in sumo_net.getEdges():
+            count += len(from_edge.getConnections(to_edge))
+    return count
+
+
+def legacy_get_sumo_id(odr2sumo_ids, odr_road_id, odr_lane_id, s=0):
+    """
+    SumoTopology.get_sumo_id sorting the lane sections on every query.
+    """
+    if (odr_road_id, odr_lane_id) not in odr2sumo_ids:
+        return None
+
+    sumo_ids = list(odr2sumo_ids[(odr_road_id, odr_lane_id)])
+    if len(sumo_ids) == 1:
+        return sumo_ids[0]
+
+    s_coords = [float(edge.split('.', 1)[1]) for edge, lane_index in sumo_ids]
+    s_coords, sumo_ids = zip(*sorted(zip(s_coords, sumo_ids)))
+    index = bisect.bisect_left(s_coords, s, lo=1) - 1
+    return sumo_ids[index]
+
+
+def outgoing_connections(sumo_net):
+    """
+    Counts the connections of the net visiting the outgoing connections of each edge.
+    """
+    count = 0
+    for edge in sumo_net.getEdges():
+        for connections in edge.getOutgoing().values():
+            count += len(connections)
+    return count
+
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def timed(results, name, function, *args):
+    """
+    Calls the function, adding its elapsed time (in seconds) to results[name].
+    """
+    start = time.perf_counter()
+    value = function(*args)
+    results.setdefault(name, []).append(time.perf_counter() - start)
+    return value
+
+
+def run(args, tmpdir, results):
+    """
+    Runs every phase of the conversion once.
+    """
+    tmp_sumo_net = os.path.join(tmpdir, 'benchmark.net.xml')
+    output = os.path.join(tmpdir, 'output.net.xml')
+
+    def run_netconvert():
+        if _start_netconvert(args.xodr_file, tmp_sumo_net).wait() != 0:
+            raise RuntimeError('There was an error when executing netconvert.')
+
+    def parse_carla_map():
+        with open(args.xodr_file, 'r') as f:
+            return carla.Map('netconvert', str(f.read()))
+
+    timed(results, 'netconvert', run_netconvert)
+    carla_map = timed(results, 'carla map', parse_carla_map)
+    sumo_net = timed(results, 'read net', sumolib.net.readNet, tmp_sumo_net)
+    sumo_topology = timed(results, 'build topology', build_topology, sumo_net)
+    tls = timed(results, 'traffic lights', build_traffic_lights, carla_map, sumo_topology,
+                args.guess_tls)
+    timed(results, 'insert traffic lights', insert_traffic_lights, tmp_sumo_net, tls, output)
+
+    # Whole conversion, with netconvert and the carla map parsing overlapped.
+    timed(results, 'netconvert_carla', netconvert_carla, args.xodr_file, output, args.guess_tls)
+
+    # Topology lookups.
+    timed(results, 'connections (all pairs)', legacy_connections, sumo_net)
+    timed(results, 'connections (outgoing)', outgoing_connections, sumo_net)
+
+    odr2sumo_ids = sumo_topology._odr2sumo_ids  # pylint: disable=protected-access
+    rng = random.Random(args.seed)
+    queries = [(road_id, lane_id, rng.uniform(0.0, args.max_s))
+               for road_id, lane_id in rng.choices(list(odr2sumo_ids), k=args.lookups)]
+
+    timed(results, 'get_sumo_id (sorting)',
+          lambda: [legacy_get_sumo_id(odr2sumo_ids, *query) for query in queries])
+    timed(results, 'get_sumo_id (indexed)',
+          lambda: [sumo_topology.get_sumo_id(*query) for query in queries])
+
+
+def main(args):
+    """
+    Runs the benchmark and prints the mean time of each phase.
+    """
+    results = {}
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for _ in range(args.repeat):
+            run(args, tmpdir, results)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print('{:<28} {:>10} {:>10}'.format('phase', 'mean ms', 'min ms'))
+    for name, times in results.items():
+        print('{:<28} {:>10.1f} {:>10.1f}'.format(name, 1000.0 * sum(times) / len(times),
+                                                   1000.0 * min(times)))
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('xodr_file', help='opendrive file (*.xodr)')
+    argparser.add_argument('--guess-tls',
+                           action='store_true',
+                           help='guess traffic lights at intersections (default: False)')
+    argparser.add_argument('--repeat',
+                           default=3,
+                           type=int,
+                           help='number of repetitions (default: 3)')
+    argparser.add_argument('--lookups',
+                           default=100000,
+                           type=int,
+                           help='number of get_sumo_id queries (default: 100000)')
+    argparser.add_argument('--max-s',
+                           default=500.0,
+                           type=float,
+                           help='maximum s coordinate of the queries (default: 500.0)')
+    argparser.add_argument('--seed', default=0, type=int, help='random seed (default: 0)')
+    argparser.add_argument('--debug', action='store_true', help='enable debug messages')
+    arguments = argparser.parse_args()
+
+    if arguments.debug:
+        logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.DEBUG)
+    else:
+        logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.ERROR)
+
+    main(arguments)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2025 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Script to compare the sumo step time of the traci and libsumo backends. Each step runs the sumo
+side of a co-simulation tick (simulation step and pose retrieval of all the vehicles).
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# ==================================================================================================
+# -- find traci module -----------------------------------------------------------------------------
+# ==================================================================================================
+
+if 'SUMO_HOME' in os.environ:
+    sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
+else:
+    sys.exit("please declare environment variable 'SUMO_HOME'")
+
+BASEDIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.append(BASEDIR)
+
+# ==================================================================================================
+# -- sumo integration imports ----------------------------------------------------------------------
+# ==================================================================================================
+
+from sumo_integration.sumo_backend import BACKENDS, traci  # pylint: disable=wrong-import-position
+from sumo_integration.sumo_simulation import SumoSimulation  # pylint: disable=wrong-import-position
+
+# ==================================================================================================
+# -- benchmark -------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+class VehiclePopulation(object):
+    """
+    VehiclePopulation keeps a fixed number of benchmark vehicles in the simulation, re-adding
+    vehicles as soon as they reach the end of their route.
+    """
+    def __init__(self, net, vclass='passenger', type_id='DEFAULT_VEHTYPE', seed=0):
+        self._rng = random.Random(seed)
+        self._edges = [edge.getID() for edge in net.getEdges() if edge.allows(vclass)]
+        self._type_id = type_id
+        self._routes = set()
+        self._sequential_id = 0
+
+        if not self._edges:
+            raise RuntimeError('No edge allows {} vehicles'.format(vclass))
+
+    def add(self, count):
+        """
+        Adds the given number of vehicles on random edges.
+        """
+        for _ in range(count):
+            edge_id = self._rng.choice(self._edges)
+            route_id = 'benchmark_route_{}'.format(edge_id)
+            if route_id not in self._routes:
+                traci.route.add(route_id, [edge_id])
+                self._routes.add(route_id)
+
+            traci.vehicle.add('benchmark_{}'.format(self._sequential_id), route_id,
+                              typeID=self._type_id, departLane='random', departPos='random')
+            self._sequential_id += 1
+
+
+def run(args, backend, num_vehicles):
+    """
+    Runs the benchmark for a backend and a number of vehicles. Returns None if the backend is not
+    available.
+    """
+    sumo_simulation = SumoSimulation(args.sumo_cfg_file, args.step_length, backend=backend)
+    try:
+        if sumo_simulation.backend != backend:
+            return None
+
+        population = VehiclePopulation(sumo_simulation.net, seed=args.seed)
+        population.add(num_vehicles)
+
+        step_times, active_vehicles = [], []
+        for step in range(args.warmup + args.steps):
+            start = time.perf_counter()
+
+            sumo_simulation.tick()
+            vehicle_ids = list(sumo_simulation.get_vehicle_states())
+            sumo_simulation.get_actor_poses(vehicle_ids)
+
+            elapsed = time.perf_counter() - start
+            if step >= args.warmup:
+                step_times.append(elapsed)
+                active_vehicles.append(len(vehicle_ids))
+
+            # Keeps the number of vehicles constant (not timed).
+            arrived = [
+                actor_id for actor_id in sumo_simulation.destroyed_actors
+                if actor_id.startswith('benchmark_')
+            ]
+            population.add(len(arrived))
+
+        return np.array(step_times) * 1000.0, np.mean(active_vehicles)
+
+    finally:
+        sumo_simulation.close()
+
+
+def main(args):
+    """
+    Runs the benchmark for every backend and number of vehicles.
+    """
+    print('{:<8} {:>9} {:>9} {:>10} {:>10}'.format('backend', 'vehicles', 'active', 'mean ms',
+                                                   'p95 ms'))
+    for num_vehicles in args.vehicles:
+        for backend in args.backends:
+            result = run(args, backend, num_vehicles)
+            if result is None:
+                print('{:<8} {:>9} {:>9}'.format(backend, num_vehicles, 'n/a'))
+                continue
+
+            step_times, active = result
+            print('{:<8} {:>9} {:>9.0f} {:>10.3f} {:>10.3f}'.format(
+                backend, num_vehicles, active, step_times.mean(), np.percentile(step_times, 95)))
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('sumo_cfg_file',
+                           nargs='?',
+                           default=os.path.join(BASEDIR, 'examples', 'Town04.sumocfg'),
+                           help='sumo configuration file (default: examples/Town04.sumocfg)')
+    argparser.add_argument('--vehicles',
+                           nargs='+',
+                           default=[100, 500, 1000],
+                           type=int,
+                           help='numbers of vehicles to benchmark (default: 100 500 1000)')
+    argparser.add_argument('--backends',
+                           nargs='+',
+                           default=list(BACKENDS),
+                           choices=BACKENDS,
+                           help='sumo backends to benchmark (default: traci libsumo)')
+    argparser.add_argument('--steps',
+                           default=200,
+                           type=int,
+                           help='number of timed steps (default: 200)')
+    argparser.add_argument('--warmup',
+                           default=20,
+                           type=int,
+                           help='number of untimed steps before measuring (default: 20)')
+    argparser.add_argument('--step-length',
+                           default=0.05,
+                           type=float,
+                           help='set fixed delta seconds (default: 0.05s)')
+    argparser.add_argument('--seed', default=0, type=int, help='random seed (default: 0)')
+    argparser.add_argument('--debug', action='store_true', help='enable debug messages')
+    arguments = argparser.parse_args()
+
+    if arguments.debug:
+        logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.DEBUG)
+    else:
+        logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.WARNING)
+
+    main(arguments)
@@ -22,6 +22,8 @@ import os
 
 import lxml.etree as ET  # pylint: disable=import-error
 
+from streaming_xml import write_child, write_prolog, xml_writer
+
 import carla  # pylint: disable=import-error, wrong-import-position
 
 # ==================================================================================================
@@ -42,19 +44,25 @@ with open('../data/vtypes.json') as f:
 
 def write_vtype_xml(filename, vtypes):
     """
-    Write route xml file.
-    """
-    root = ET.Element('routes')
+    Write route xml file. The vtypes are written as they are consumed from `vtypes` (any iterable)
+    and the file is only replaced once all of them have been written.
 
-    root.addprevious(
-        ET.Comment('generated on {date:%Y-%m-%d %H:%M:%S} by {script:}'.format(
-            date=datetime.datetime.now(), script=os.path.basename(__file__))))
+        :return: number of written vtypes.
+    """
+    counter = 0
+    with xml_writer(filename) as xf:
+        write_prolog(
+            xf,
+            ET.Comment('generated on {date:%Y-%m-%d %H:%M:%S} by {script:}'.format(
+                date=datetime.datetime.now(), script=os.path.basename(__file__))))
 
-    for vtype in vtypes:
-        ET.SubElement(root, 'vType', vtype)
+        with xf.element('routes'):
+            for vtype in vtypes:
+                write_child(xf, ET.Element('vType', vtype))
+                counter += 1
+            xf.write('\n')
 
-    tree = ET.ElementTree(root)
-    tree.write(filename, pretty_print=True, encoding='UTF-8', xml_declaration=True)
+    return counter
 
 
 def generate_vtype(vehicle):
@@ -109,21 +117,22 @@ def main(args):
 
         transform = world.get_map().get_spawn_points()[0]
 
-        vtypes = []
-        for blueprint in vehicle_blueprints:
-            logging.info('processing vtype for %s', blueprint.id)
-            vehicle = world.spawn_actor(blueprint, transform)
-
-            vtype = generate_vtype(vehicle)
-            if vtype:
-                vtypes.append(vtype)
-            else:
-                logging.error(
-                    'type id %s could no be mapped to any vtype', vehicle.type_id)
-
-            vehicle.destroy()
-
-        write_vtype_xml(args.output_file, vtypes)
+        def generate_vtypes():
+            for blueprint in vehicle_blueprints:
+                logging.info('processing vtype for %s', blueprint.id)
+                vehicle = world.spawn_actor(blueprint, transform)
+                try:
+                    vtype = generate_vtype(vehicle)
+                finally:
+                    vehicle.destroy()
+
+                if vtype:
+                    yield vtype
+                else:
+                    logging.error(
+                        'type id %s could no be mapped to any vtype', blueprint.id)
+
+        write_vtype_xml(args.output_file, generate_vtypes())
 
     finally:
         logging.info('done')
@@ -17,12 +17,15 @@ the net and inserts, manually, the traffic light landmarks retrieved from the op
 import argparse
 import bisect
 import collections
+import hashlib
+import json
 import logging
 import os
 import shutil
 import subprocess
 import sys
 import tempfile
+import time
 
 import lxml.etree as ET  # pylint: disable=import-error
 
@@ -69,6 +72,50 @@ class SumoTopology(object):
         # Mapped ids between sumo and opendrive.
         self._odr2sumo_ids = odr2sumo_ids
 
+        # Lookup indexes, derived from the previous structures.
+        #
+        #   sections -- {(odr_road_id, odr_lane_id): (
+        #                   (s, ...), ((sumo_edge_id, sumo_lane_index), ...))}
+        #   incoming -- {(odr_road_id, odr_lane_id): [(sumo_edge_id, sumo_lane_index), ...]}
+        #   outgoing -- {(odr_road_id, odr_lane_id): [(sumo_edge_id, sumo_lane_index), ...]}
+        self._sections = {}
+        for odr_id, sumo_ids in self._odr2sumo_ids.items():
+            self._sections[odr_id] = SumoTopology._sort_lane_sections(sumo_ids)
+
+        self._incoming = {}
+        self._outgoing = {}
+        for odr_id, connections in self._paths.items():
+            self._incoming[odr_id] = list(set([from_ for from_, _ in connections]))
+            self._outgoing[odr_id] = list(set([to_ for _, to_ in connections]))
+
+    @staticmethod
+    def _sort_lane_sections(sumo_ids):
+        """
+        Returns the s coordinates of the given sumo edges, sorted, and the sumo ids in the same
+        order. Sumo edges of a split opendrive road are named after their starting s coordinate
+        (i.e., <odr_road_id>.<s>). If some edge does not follow this naming, the s coordinates are
+        None and the sumo ids are left unsorted.
+        """
+        sumo_ids = list(sumo_ids)
+        if len(sumo_ids) == 1:
+            return (0.0,), tuple(sumo_ids)
+
+        # All the related sumo edges should belong to the same opendrive road but to different
+        # lane sections.
+        if len(set([edge.split('.', 1)[0] for edge, lane_index in sumo_ids])) != 1:
+            logging.warning('[Building topology] Sumo edges %s belong to different opendrive '
+                            'roads.', sorted(sumo_ids))
+
+        try:
+            s_coords = [float(edge.split('.', 1)[1]) for edge, lane_index in sumo_ids]
+        except (IndexError, ValueError):
+            logging.warning('[Building topology] Sumo edges %s are not named after their lane '
+                            'section. The lane sections will not be sorted.', sorted(sumo_ids))
+            return None, tuple(sumo_ids)
+
+        s_coords, sumo_ids = zip(*sorted(zip(s_coords, sumo_ids)))
+        return s_coords, sumo_ids
+
     # http://sumo.sourceforge.net/userdoc/Networks/Import/OpenDRIVE.html#dealing_with_lane_sections
     def get_sumo_id(self, odr_road_id, odr_lane_id, s=0):
         """
@@ -76,26 +123,18 @@ class SumoTopology(object):
         argument 's' allows selecting the better sumo edge when it has been split into different
         edges due to different odr lane sections.
         """
-        if (odr_road_id, odr_lane_id) not in self._odr2sumo_ids:
+        if (odr_road_id, odr_lane_id) not in self._sections:
             return None
 
-        sumo_ids = list(self._odr2sumo_ids[(odr_road_id, odr_lane_id)])
+        s_coords, sumo_ids = self._sections[(odr_road_id, odr_lane_id)]
 
-        if (len(sumo_ids)) == 1:
+        if len(sumo_ids) == 1 or s_coords is None:
             return sumo_ids[0]
 
         # The edge is split into different lane sections. We return the nearest edge based on the
         # s coordinate of the provided landmark.
-        else:
-            # Ensures that all the related sumo edges belongs to the same opendrive road but to
-            # different lane sections.
-            assert set([edge.split('.', 1)[0] for edge, lane_index in sumo_ids]) == 1
-
-            s_coords = [float(edge.split('.', 1)[1]) for edge, lane_index in sumo_ids]
-
-            s_coords, sumo_ids = zip(*sorted(zip(s_coords, sumo_ids)))
-            index = bisect.bisect_left(s_coords, s, lo=1) - 1
-            return sumo_ids[index]
+        index = bisect.bisect_left(s_coords, s, lo=1) - 1
+        return sumo_ids[index]
 
     def is_junction(self, odr_road_id, odr_lane_id):
         """
@@ -117,24 +156,14 @@ class SumoTopology(object):
         If the pair (odr_road_id, odr_lane_id) belongs to a junction, returns the incoming edges of
         the path. Otherwise, return and empty list.
         """
-        if not self.is_junction(odr_road_id, odr_lane_id):
-            return []
-
-        result = set([(connection[0][0], connection[0][1])
-                      for connection in self._paths[(odr_road_id, odr_lane_id)]])
-        return list(result)
+        return list(self._incoming.get((odr_road_id, odr_lane_id), []))
 
     def get_outgoing(self, odr_road_id, odr_lane_id):
         """
         If the pair (odr_road_id, odr_lane_id) belongs to a junction, returns the outgoing edges of
         the path. Otherwise, return and empty list.
         """
-        if not self.is_junction(odr_road_id, odr_lane_id):
-            return []
-
-        result = set([(connection[1][0], connection[1][1])
-                      for connection in self._paths[(odr_road_id, odr_lane_id)]])
-        return list(result)
+        return list(self._outgoing.get((odr_road_id, odr_lane_id), []))
 
     def get_path_connectivity(self, odr_road_id, odr_lane_id):
         """
@@ -182,9 +211,9 @@ def build_topology(sumo_net):
     topology = {}
     paths = {}
 
+    # Only the outgoing connections of each edge are visited.
     for from_edge in sumo_net.getEdges():
-        for to_edge in sumo_net.getEdges():
-            connections = from_edge.getConnections(to_edge)
+        for connections in from_edge.getOutgoing().values():
             for connection in connections:
                 from_ = connection.getFromLane()
                 to_ = connection.getToLane()
@@ -245,6 +274,8 @@ class SumoTrafficLight(object):
         self.phases = []
         self.parameters = set()
         self.connections = set()
+        # (from_road, to_road, from_lane, to_lane) of the connections.
+        self._connection_keys = set()
 
     @staticmethod
     def generate_tl_id(from_edge, to_edge):
@@ -291,6 +322,8 @@ class SumoTrafficLight(object):
         Adds a new connection.
         """
         self.connections.add(connection)
+        self._connection_keys.add((connection.from_road, connection.to_road, connection.from_lane,
+                                   connection.to_lane))
 
     def add_landmark(self,
                      landmark_id,
@@ -308,13 +341,9 @@ class SumoTrafficLight(object):
         if link_index == -1:
             link_index = len(self.connections)
 
-        def is_same_connection(c1, c2):
-            return c1.from_road == c2.from_road and c1.to_road == c2.to_road and \
-                   c1.from_lane == c2.from_lane and c1.to_lane == c2.to_lane
-
         connection = SumoTrafficLight.Connection(tlid, from_road, to_road, from_lane, to_lane,
                                                  link_index)
-        if any([is_same_connection(connection, c) for c in self.connections]):
+        if (from_road, to_road, from_lane, to_lane) in self._connection_keys:
             logging.warning(
                 'Different landmarks controlling the same connection. Only one will be included.')
             return False
@@ -344,56 +373,206 @@ class SumoTrafficLight(object):
 
 
 # ==================================================================================================
-# -- main ------------------------------------------------------------------------------------------
+# -- netconvert cache ------------------------------------------------------------------------------
 # ==================================================================================================
 
+NETCONVERT_TYPE_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data',
+                                    'opendrive_netconvert.typ.xml')
 
-def _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls=False):
+NETCONVERT_OPTIONS = [
+    '--geometry.min-radius.fix',
+    '--geometry.remove',
+    '--opendrive.curve-resolution', '1',
+    '--opendrive.import-all-lanes',
+    # Necessary to link odr and sumo ids.
+    '--output.original-names',
+    # Discard loading traffic lights as them will be inserted manually afterwards.
+    '--tls.discard-loaded', 'true',
+]
+
+# Must be increased whenever the conversion implemented in this script changes its output, so that
+# nets cached by previous versions are not reused.
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'CARLA_SUMO_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'carla-sumo', 'netconvert'))
+DEFAULT_CACHE_MAX_ENTRIES = 16
+
+_netconvert_version = None
+
+
+def get_netconvert_version():
     """
-    Implements netconvert carla.
+    Returns the version reported by netconvert (first line of `netconvert --version`).
     """
-    # ----------
-    # netconvert
-    # ----------
-    basename = os.path.splitext(os.path.basename(xodr_file))[0]
-    tmp_sumo_net = os.path.join(tmpdir, basename + '.net.xml')
+    global _netconvert_version  # pylint: disable=global-statement
+    if _netconvert_version is None:
+        try:
+            output = subprocess.check_output(['netconvert', '--version'], universal_newlines=True)
+        except (OSError, subprocess.CalledProcessError):
+            raise RuntimeError('There was an error when executing netconvert.')
+        _netconvert_version = output.strip().splitlines()[0] if output.strip() else ''
+    return _netconvert_version
+
+
+def get_cache_key(xodr_file, guess_tls=False):
+    """
+    Returns the cache key of a conversion. The key changes with the opendrive content, the
+    netconvert options and type file, the netconvert version and CACHE_FORMAT_VERSION.
+    """
+    sha = hashlib.sha256()
+    for filename in (xodr_file, NETCONVERT_TYPE_FILE):
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+
+    sha.update(
+        json.dumps({
+            'format': CACHE_FORMAT_VERSION,
+            'netconvert': get_netconvert_version(),
+            'options': NETCONVERT_OPTIONS,
+            'guess_tls': guess_tls
+        }, sort_keys=True).encode('utf-8'))
+    return sha.hexdigest()
+
+
+class NetconvertCache(object):
+    """
+    NetconvertCache stores converted sumo nets on disk. Each entry is a folder named after its cache
+    key (see get_cache_key) with the following files:
+
+        * net.net.xml: the sumo net, traffic lights included.
+        * metadata.json: the key and information about the conversion.
+
+    Entries are written into a temporal folder and renamed, so a half written entry is never used.
+    An entry whose files are missing or do not match its key is removed and the net converted again.
+    Only the `max_entries` most recently used entries are kept.
+    """
+    NET_FILE = 'net.net.xml'
+    METADATA_FILE = 'metadata.json'
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [
+            entry for entry in os.listdir(self.cache_dir)
+            if not entry.startswith('.') and os.path.isdir(self._entry_dir(entry))
+        ]
+
+    def get(self, key):
+        """
+        Returns the path to the cached sumo net of the given key or None if there is no valid entry.
+        """
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return None
+
+        try:
+            with open(os.path.join(entry_dir, self.METADATA_FILE), 'r') as f:
+                metadata = json.load(f)
+        except (IOError, OSError, ValueError):
+            metadata = {}
+
+        net_file = os.path.join(entry_dir, self.NET_FILE)
+        if metadata.get('key') != key or metadata.get('format') != CACHE_FORMAT_VERSION or \
+           not os.path.isfile(net_file):
+            logging.warning('Removing invalid netconvert cache entry %s.', key)
+            self.remove(key)
+            return None
+
+        # Marks the entry as recently used.
+        os.utime(entry_dir, None)
+        return net_file
+
+    def put(self, key, net_file, metadata=None):
+        """
+        Stores a converted sumo net.
+
+            :returns: path to the cached sumo net.
+        """
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        metadata = dict(metadata or {})
+        metadata.update({'key': key, 'format': CACHE_FORMAT_VERSION, 'created': time.time()})
+
+        tmp_dir = tempfile.mkdtemp(prefix='.', dir=self.cache_dir)
+        try:
+            shutil.copyfile(net_file, os.path.join(tmp_dir, self.NET_FILE))
+            with open(os.path.join(tmp_dir, self.METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, indent=2, sort_keys=True)
+
+            try:
+                os.rename(tmp_dir, self._entry_dir(key))
+            except OSError:
+                # Another process has stored the same entry in the meantime.
+                logging.debug('Netconvert cache entry %s already exists.', key)
+
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+
+        self.prune()
+        return os.path.join(self._entry_dir(key), self.NET_FILE)
+
+    def remove(self, key):
+        """
+        Removes the entry of the given key.
+        """
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def prune(self):
+        """
+        Removes the least recently used entries exceeding `max_entries`.
+        """
+        entries = sorted(self._entries(),
+                         key=lambda entry: os.path.getmtime(self._entry_dir(entry)),
+                         reverse=True)
+        for entry in entries[self.max_entries:]:
+            logging.debug('Evicting netconvert cache entry %s.', entry)
+            self.remove(entry)
+
+    def clear(self):
+        """
+        Removes all the entries.
+        """
+        for entry in self._entries():
+            self.remove(entry)
 
+
+# ==================================================================================================
+# -- main ------------------------------------------------------------------------------------------
+# ==================================================================================================
+
+
+def _start_netconvert(xodr_file, output):
+    """
+    Starts netconvert in a separate process. Returns the running process.
+    """
     try:
-        basedir = os.path.dirname(os.path.realpath(__file__))
-        result = subprocess.call(['netconvert',
+        return subprocess.Popen(['netconvert',
             '--opendrive', xodr_file,
-            '--output-file', tmp_sumo_net,
-            '--geometry.min-radius.fix',
-            '--geometry.remove',
-            '--opendrive.curve-resolution', '1',
-            '--opendrive.import-all-lanes',
-            '--type-files', os.path.join(basedir, 'data/opendrive_netconvert.typ.xml'),
-            # Necessary to link odr and sumo ids.
-            '--output.original-names',
-            # Discard loading traffic lights as them will be inserted manually afterwards.
-            '--tls.discard-loaded', 'true',
-        ])
-    except subprocess.CalledProcessError:
+            '--output-file', output,
+            '--type-files', NETCONVERT_TYPE_FILE
+        ] + NETCONVERT_OPTIONS)
+    except OSError:
         raise RuntimeError('There was an error when executing netconvert.')
-    else:
-        if result != 0:
-            raise RuntimeError('There was an error when executing netconvert.')
 
-    # --------
-    # Sumo net
-    # --------
-    sumo_net = sumolib.net.readNet(tmp_sumo_net)
-    sumo_topology = build_topology(sumo_net)
 
-    # ---------
-    # Carla map
-    # ---------
-    with open(xodr_file, 'r') as f:
-        carla_map = carla.Map('netconvert', str(f.read()))
+def build_traffic_lights(carla_map, sumo_topology, guess_tls=False):
+    """
+    Builds the sumo traffic lights of the traffic light landmarks of the carla map.
 
-    # ---------
-    # Landmarks
-    # ---------
+        :returns: dict {tlid: SumoTrafficLight}
+    """
     tls = {}  # {tlsid: SumoTrafficLight}
 
     landmarks = carla_map.get_all_landmarks_of_type('1000001')
@@ -456,25 +635,35 @@ def _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls=False):
                 else:
                     logging.warning('Landmark %s could not be added.', landmark.id)
 
-    # ---------------
-    # Modify sumo net
-    # ---------------
+    return tls
+
+
+def insert_traffic_lights(sumo_net_file, tls, output):
+    """
+    Writes the sumo net with the given traffic lights into output.
+    """
     parser = ET.XMLParser(remove_blank_text=True)
-    tree = ET.parse(tmp_sumo_net, parser)
+    tree = ET.parse(sumo_net_file, parser)
     root = tree.getroot()
 
+    edges_tags = tree.xpath('//edge')
+    if tls and not edges_tags:
+        raise RuntimeError('No edges found in sumo net.')
+
+    # Connection tags indexed by (from, to, fromLane, toLane) to avoid searching the whole net for
+    # each traffic light connection.
+    connection_tags = collections.defaultdict(list)
+    for tag in root.iter('connection'):
+        key = (tag.get('from'), tag.get('to'), tag.get('fromLane'), tag.get('toLane'))
+        connection_tags[key].append(tag)
+
     for tl in tls.values():
         SumoTrafficLight.generate_default_program(tl)
-        edges_tags = tree.xpath('//edge')
-        if not edges_tags:
-            raise RuntimeError('No edges found in sumo net.')
         root.insert(root.index(edges_tags[-1]) + 1, tl.to_xml())
 
         for connection in tl.connections:
-            tags = tree.xpath(
-                '//connection[@from="{}" and @to="{}" and @fromLane="{}" and @toLane="{}"]'.format(
-                    connection.from_road, connection.to_road, connection.from_lane,
-                    connection.to_lane))
+            tags = connection_tags.get((str(connection.from_road), str(connection.to_road),
+                                        str(connection.from_lane), str(connection.to_lane)))
 
             if tags:
                 if len(tags) > 1:
@@ -493,27 +682,100 @@ def _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls=False):
     tree.write(output, pretty_print=True, encoding='UTF-8', xml_declaration=True)
 
 
-def netconvert_carla(xodr_file, output, guess_tls=False):
+def _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls=False):
+    """
+    Implements netconvert carla.
+    """
+    basename = os.path.splitext(os.path.basename(xodr_file))[0]
+    tmp_sumo_net = os.path.join(tmpdir, basename + '.net.xml')
+
+    # netconvert runs in its own process while the carla map is parsed from the same opendrive.
+    process = _start_netconvert(xodr_file, tmp_sumo_net)
+    try:
+        with open(xodr_file, 'r') as f:
+            carla_map = carla.Map('netconvert', str(f.read()))
+    except Exception:
+        process.kill()
+        process.wait()
+        raise
+
+    if process.wait() != 0:
+        raise RuntimeError('There was an error when executing netconvert.')
+
+    sumo_net = sumolib.net.readNet(tmp_sumo_net)
+    sumo_topology = build_topology(sumo_net)
+
+    tls = build_traffic_lights(carla_map, sumo_topology, guess_tls)
+    insert_traffic_lights(tmp_sumo_net, tls, output)
+
+
+def netconvert_carla(xodr_file, output, guess_tls=False, cache=None):
     """
     Generates sumo net.
 
         :param xodr_file: opendrive file (*.xodr)
         :param output: output file (*.net.xml)
         :param guess_tls: guess traffic lights at intersections.
+        :param cache: NetconvertCache used to reuse previous conversions of the same opendrive
+            (default: None, the net is always converted).
         :returns: path to the generated sumo net.
     """
+    key = None
+    if cache is not None:
+        key = get_cache_key(xodr_file, guess_tls)
+        cached_net = cache.get(key)
+        if cached_net is not None:
+            logging.info('Using cached sumo net for %s.', xodr_file)
+            shutil.copyfile(cached_net, output)
+            return output
+
     try:
         tmpdir = tempfile.mkdtemp()
         _netconvert_carla_impl(xodr_file, output, tmpdir, guess_tls)
 
+        if cache is not None:
+            cache.put(key, output, {
+                'xodr_file': os.path.basename(xodr_file),
+                'guess_tls': guess_tls,
+                'netconvert_version': get_netconvert_version()
+            })
+
     finally:
         if os.path.exists(tmpdir):
             shutil.rmtree(tmpdir)
 
+    return output
+
+
+def prewarm_cache(xodr_files, cache, guess_tls=False):
+    """
+    Converts the given opendrive files into the cache, skipping the ones already cached.
+
+        :returns: number of converted files.
+    """
+    converted = 0
+    for xodr_file in xodr_files:
+        if cache.get(get_cache_key(xodr_file, guess_tls)) is not None:
+            logging.info('%s is already cached.', xodr_file)
+            continue
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            basename = os.path.splitext(os.path.basename(xodr_file))[0]
+            netconvert_carla(xodr_file, os.path.join(tmpdir, basename + '.net.xml'), guess_tls,
+                             cache)
+            converted += 1
+        finally:
+            shutil.rmtree(tmpdir)
+
+    return converted
+
 
 if __name__ == '__main__':
     argparser = argparse.ArgumentParser(description=__doc__)
-    argparser.add_argument('xodr_file', help='opendrive file (*.xodr')
+    argparser.add_argument('xodr_file',
+                           nargs='*',
+                           help='opendrive file (*.xodr), several files with --prewarm')
     argparser.add_argument('--output',
                            '-o',
                            default='net.net.xml',
@@ -522,6 +784,39 @@ if __name__ == '__main__':
     argparser.add_argument('--guess-tls',
                            action='store_true',
                            help='guess traffic lights at intersections (default: False)')
+    argparser.add_argument('--cache',
+                           action='store_true',
+                           help='reuse and store the conversion in the netconvert cache')
+    argparser.add_argument('--cache-dir',
+                           default=DEFAULT_CACHE_DIR,
+                           type=str,
+                           help='netconvert cache folder (default: {})'.format(DEFAULT_CACHE_DIR))
+    argparser.add_argument('--prewarm',
+                           action='store_true',
+                           help='only store the conversion of the given files in the cache. Use '
+                           '--guess-tls to prewarm the nets used by spawn_npc_sumo.py')
+    argparser.add_argument('--clear-cache',
+                           action='store_true',
+                           help='remove all the entries of the netconvert cache')
+    argparser.add_argument('--debug', action='store_true', help='enable debug messages')
     args = argparser.parse_args()
 
-    netconvert_carla(args.xodr_file, args.output, args.guess_tls)
+    if args.debug:
+        logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.DEBUG)
+    else:
+        logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+    netconvert_cache = NetconvertCache(args.cache_dir)
+    if args.clear_cache:
+        netconvert_cache.clear()
+        logging.info('Netconvert cache cleared.')
+
+    if args.prewarm:
+        converted = prewarm_cache(args.xodr_file, netconvert_cache, args.guess_tls)
+        logging.info('Converted %d of %d opendrive files into %s.', converted,
+                     len(args.xodr_file), args.cache_dir)
+    elif len(args.xodr_file) == 1:
+        netconvert_carla(args.xodr_file[0], args.output, args.guess_tls,
+                         netconvert_cache if args.cache else None)
+    elif args.xodr_file or not args.clear_cache:
+        argparser.error('a single opendrive file is required (use --prewarm for several files)')
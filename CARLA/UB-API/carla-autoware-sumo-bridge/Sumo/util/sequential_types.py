@@ -15,12 +15,14 @@ Script to modify automatically vtypes to carla type ids in sumo route files.
 # ==================================================================================================
 
 import argparse
+import concurrent.futures
 import fnmatch
 import json
 import logging
+import os
 import random
 
-import lxml.etree as ET  # pylint: disable=import-error
+from streaming_xml import iter_children, write_child, write_prolog, xml_writer
 
 # ==================================================================================================
 # -- load vtypes -----------------------------------------------------------------------------------
@@ -33,32 +35,61 @@ with open('../data/vtypes.json') as f:
 # -- main ------------------------------------------------------------------------------------------
 # ==================================================================================================
 
-def main(route_files, vtypes, _random=False):
+def rewrite_route_file(filename, vtypes, _random=False):
     """
-    Main method to automatically modify vtypes to carla type ids in sumo route files.
-    """
-    for filename in route_files:
-        tree = ET.parse(filename)
-        root = tree.getroot()
-
-        if not _random:
-            index = 0
-
-        counter = 0
-        for vtype in root.iter('vehicle'):
-            if _random:
-                new_type = random.choice(vtypes)
-            else:
-                new_type = vtypes[index]
-                index = (index + 1) if index < (len(vtypes) - 1) else 0
-
-            vtype.set('type', new_type)
-            counter += 1
-
-        tree = ET.ElementTree(root)
-        tree.write(filename, pretty_print=True, encoding='UTF-8', xml_declaration=True)
+    Modifies the vtypes of a sumo route file. The file is streamed one top-level element at a time,
+    so memory does not grow with the number of vehicles, and replaced atomically.
 
-        logging.info('modified %d vtype(s) in %s', counter, filename)
+        :return: number of modified vtypes.
+    """
+    rng = random.Random()
+    index = 0
+    counter = 0
+
+    with xml_writer(filename) as xf:
+        children = iter_children(filename)
+        for kind, node in children:
+            if kind == 'root':
+                root = node
+                break
+            write_prolog(xf, node)
+        else:
+            raise RuntimeError('No root element found in {}'.format(filename))
+
+        with xf.element(root.tag, dict(root.attrib), nsmap=root.nsmap):
+            for _, node in children:
+                if isinstance(node.tag, str):
+                    for vtype in node.iter('vehicle'):
+                        if _random:
+                            new_type = rng.choice(vtypes)
+                        else:
+                            new_type = vtypes[index]
+                            index = (index + 1) if index < (len(vtypes) - 1) else 0
+
+                        vtype.set('type', new_type)
+                        counter += 1
+
+                write_child(xf, node)
+            xf.write('\n')
+
+    return counter
+
+
+def main(route_files, vtypes, _random=False, jobs=1):
+    """
+    Main method to automatically modify vtypes to carla type ids in sumo route files. Each route
+    file is processed independently, up to `jobs` files in parallel.
+    """
+    if jobs > 1 and len(route_files) > 1:
+        with concurrent.futures.ProcessPoolExecutor(min(jobs, len(route_files))) as executor:
+            counters = executor.map(rewrite_route_file, route_files, [vtypes] * len(route_files),
+                                    [_random] * len(route_files))
+            for filename, counter in zip(route_files, counters):
+                logging.info('modified %d vtype(s) in %s', counter, filename)
+    else:
+        for filename in route_files:
+            counter = rewrite_route_file(filename, vtypes, _random)
+            logging.info('modified %d vtype(s) in %s', counter, filename)
 
 
 if __name__ == '__main__':
@@ -77,6 +108,13 @@ if __name__ == '__main__':
                            metavar='PATTERN',
                            default='vehicle.*',
                            help='vehicles filter (default: "vehicle.*")')
+    argparser.add_argument('--jobs',
+                           '-j',
+                           metavar='N',
+                           default=os.cpu_count() or 1,
+                           type=int,
+                           help='number of route files processed in parallel (default: number of '
+                           'cpus)')
     argparser.add_argument('--verbose', '-v', action='store_true', help='increase output verbosity')
     args = argparser.parse_args()
 
@@ -86,4 +124,4 @@ if __name__ == '__main__':
         logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.WARNING)
 
     filtered_vtypes = [vtype for vtype in VTYPES if fnmatch.fnmatch(vtype, args.filterv)]
-    main(args.route_files, filtered_vtypes, args.random)
+    main(args.route_files, filtered_vtypes, args.random, args.jobs)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2025 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+"""
+Helpers to write large sumo xml files incrementally, one top-level element at a time, and to
+replace files atomically.
+"""
+
+# ==================================================================================================
+# -- imports ---------------------------------------------------------------------------------------
+# ==================================================================================================
+
+import contextlib
+import os
+import shutil
+import tempfile
+
+import lxml.etree as ET  # pylint: disable=import-error
+
+# ==================================================================================================
+# -- streaming xml ---------------------------------------------------------------------------------
+# ==================================================================================================
+
+INDENT = '  '
+
+
+@contextlib.contextmanager
+def atomic_output(filename):
+    """
+    Yields a temporal file path in the same folder as `filename`. When the block finishes without
+    errors, the temporal file is renamed to `filename`; otherwise, it is removed and `filename` is
+    left untouched.
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(prefix='.{}.'.format(os.path.basename(filename)),
+                                        suffix='.tmp',
+                                        dir=dirname)
+    os.close(fd)
+    try:
+        yield tmp_filename
+
+        if os.path.exists(filename):
+            shutil.copymode(filename, tmp_filename)
+        os.replace(tmp_filename, filename)
+
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+@contextlib.contextmanager
+def xml_writer(filename):
+    """
+    Yields an incremental xml writer (lxml.etree.xmlfile) with the xml declaration already written.
+    The document is written into a temporal file that replaces `filename` once it is complete.
+    """
+    with atomic_output(filename) as tmp_filename:
+        with ET.xmlfile(tmp_filename, encoding='UTF-8') as xf:
+            xf.write_declaration()
+            yield xf
+
+        # Same ending as the lxml pretty printer.
+        with open(tmp_filename, 'ab') as f:
+            f.write(b'\n')
+
+
+def write_prolog(xf, node):
+    """
+    Writes a comment or processing instruction before the root element, in its own line.
+    """
+    node.tail = '\n'
+    xf.write(node)
+
+
+def write_child(xf, element):
+    """
+    Writes a top-level element (i.e., a child of the root) with the same indentation used by the
+    lxml pretty printer.
+
+        :param xf: lxml.etree.xmlfile writer inside the root element.
+        :param element: element, comment or processing instruction.
+    """
+    xf.write('\n' + INDENT)
+    if isinstance(element.tag, str):
+        ET.indent(element, space=INDENT, level=1)
+    element.tail = None
+    xf.write(element)
+
+
+def iter_children(filename):
+    """
+    Parses `filename` incrementally. Yields ('prolog', node) for the comments and processing
+    instructions before the root, ('root', root) once the root starts (without its children) and
+    ('child', node) for every complete top-level node. Children are detached from the root before
+    being yielded, so memory stays constant regardless of the file size.
+    """
+    depth = 0
+    root, pending = None, None
+    for event, node in ET.iterparse(filename,
+                                    events=('start', 'end', 'comment', 'pi'),
+                                    remove_blank_text=True):
+        if event == 'start':
+            depth += 1
+            if depth == 1:
+                root = node
+                yield 'root', node
+            continue
+
+        if event == 'end':
+            depth -= 1
+            if depth != 1:
+                continue
+        elif depth == 0:
+            if root is None:
+                yield 'prolog', node
+            continue
+        elif depth > 1:
+            # Comments inside a top-level element are written with that element.
+            continue
+
+        # A node is only detached once the parser has moved past it (i.e., when the next top-level
+        # node is complete), as lxml does not allow modifying the node being parsed.
+        if pending is not None:
+            root.remove(pending)
+            yield 'child', pending
+        pending = node
+
+    if pending is not None:
+        root.remove(pending)
+        yield 'child', pending
@@ -0,0 +1,131 @@
+import numpy as np
+
+
+class FleetHealthMonitor:
+    """Tracks managed traffic vehicles in slot-indexed NumPy arrays.
+
+    Every rule (fallen off the map, outside the spawn bounding box, stuck) is
+    evaluated for the whole fleet in one vectorized pass over positions read
+    from a single ``carla.WorldSnapshot``, so checks are cheap enough to run on
+    every tick.
+
+    A vehicle only counts as missing once it has been seen in a snapshot, or
+    once snapshots are more than ``spawn_grace_frames`` newer than the frame it
+    was tracked at. Snapshots received by the client can lag behind the server,
+    so one taken before a spawn may still arrive after the spawn returns.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, bounding_box, fall_off_z=-10.0, stuck_distance=1.0, stuck_seconds=15.0,
+                 spawn_grace_frames=20):
+        self.x_min, self.y_min, self.x_max, self.y_max = bounding_box
+        self.fall_off_z = fall_off_z
+        self.stuck_distance = stuck_distance
+        self.stuck_seconds = stuck_seconds
+        self.spawn_grace_frames = spawn_grace_frames
+
+        self._slots = {}  # {actor_id: slot}
+        self._free_slots = list(range(self.INITIAL_CAPACITY - 1, -1, -1))
+        self._ids = np.full(self.INITIAL_CAPACITY, -1, dtype=np.int64)
+        self._active = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self._observed = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self._spawn_frames = np.full(self.INITIAL_CAPACITY, -1, dtype=np.int64)
+        self._positions = np.zeros((self.INITIAL_CAPACITY, 3))
+        self._anchor_positions = np.full((self.INITIAL_CAPACITY, 3), np.nan)
+        self._anchor_times = np.zeros(self.INITIAL_CAPACITY)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def track(self, actor_ids, frame=None):
+        """Track ``actor_ids``, spawned after the snapshot of ``frame``.
+
+        Without ``frame`` the vehicles are assumed to be in every later snapshot.
+        """
+        for actor_id in actor_ids:
+            if actor_id in self._slots:
+                continue
+            if not self._free_slots:
+                self._grow()
+            slot = self._free_slots.pop()
+            self._slots[actor_id] = slot
+            self._ids[slot] = actor_id
+            self._active[slot] = True
+            self._observed[slot] = False
+            self._spawn_frames[slot] = -1 if frame is None else frame
+            self._anchor_positions[slot] = np.nan
+
+    def untrack(self, actor_ids):
+        for actor_id in actor_ids:
+            slot = self._slots.pop(actor_id, None)
+            if slot is None:
+                continue
+            self._ids[slot] = -1
+            self._active[slot] = False
+            self._free_slots.append(slot)
+
+    def tracked_ids(self):
+        return list(self._slots)
+
+    def evaluate(self, snapshot):
+        """Return ``{"fallen", "out_of_bounds", "stuck", "missing"}`` id lists for ``snapshot``.
+
+        Unhealthy and missing vehicles are untracked before returning, so the
+        caller only needs to destroy/respawn them.
+        """
+        now = float(snapshot.timestamp.elapsed_seconds)
+        seen = np.zeros(len(self._active), dtype=bool)
+        slots = self._slots
+        positions = self._positions
+        for actor_snapshot in snapshot:
+            slot = slots.get(actor_snapshot.id)
+            if slot is None:
+                continue
+            location = actor_snapshot.get_transform().location
+            positions[slot] = (location.x, location.y, location.z)
+            seen[slot] = True
+
+        x = positions[:, 0]
+        y = positions[:, 1]
+        z = positions[:, 2]
+        self._observed |= seen
+        settled = snapshot.frame > self._spawn_frames + self.spawn_grace_frames
+        missing = self._active & ~seen & (self._observed | settled)
+        fallen = seen & (z < self.fall_off_z)
+        out_of_bounds = seen & ~fallen & ~(
+            (x >= self.x_min) & (x <= self.x_max) & (y >= self.y_min) & (y <= self.y_max)
+        )
+
+        in_play = seen & ~fallen & ~out_of_bounds
+        displacement = np.linalg.norm(positions - self._anchor_positions, axis=1)
+        # NaN anchors (first observation) compare False, so they re-anchor here too.
+        moved = in_play & ~(displacement < self.stuck_distance)
+        self._anchor_positions[moved] = positions[moved]
+        self._anchor_times[moved] = now
+        stuck = in_play & ~moved & (now - self._anchor_times >= self.stuck_seconds)
+
+        result = {
+            "fallen": self._ids[fallen].tolist(),
+            "out_of_bounds": self._ids[out_of_bounds].tolist(),
+            "stuck": self._ids[stuck].tolist(),
+            "missing": self._ids[missing].tolist(),
+        }
+        self.untrack(actor_id for ids in result.values() for actor_id in ids)
+        return result
+
+    def _grow(self):
+        old_capacity = len(self._active)
+        new_capacity = old_capacity * 2
+        self._ids = np.concatenate([self._ids, np.full(old_capacity, -1, dtype=np.int64)])
+        self._active = np.concatenate([self._active, np.zeros(old_capacity, dtype=bool)])
+        self._observed = np.concatenate([self._observed, np.zeros(old_capacity, dtype=bool)])
+        self._spawn_frames = np.concatenate(
+            [self._spawn_frames, np.full(old_capacity, -1, dtype=np.int64)]
+        )
+        self._positions = np.concatenate([self._positions, np.zeros((old_capacity, 3))])
+        self._anchor_positions = np.concatenate(
+            [self._anchor_positions, np.full((old_capacity, 3), np.nan)]
+        )
+        self._anchor_times = np.concatenate([self._anchor_times, np.zeros(old_capacity)])
+        self._free_slots.extend(range(new_capacity - 1, old_capacity - 1, -1))
@@ -19,9 +19,18 @@ import threading
 from numpy import random
 import time
 
+from fleet_health import FleetHealthMonitor
+from spawn_points import SpawnPointManager
 from telemetry import Telemetry
 
 
+FALL_OFF_Z_THRESHOLD = -10.0
+STUCK_DISTANCE_THRESHOLD = 1.0  # Minimum distance (meters) a vehicle must move within STUCK_SECONDS
+STUCK_SECONDS = 15.0  # Simulation seconds without moving STUCK_DISTANCE_THRESHOLD before destroying
+SPAWN_CLEARANCE = 5.0  # Spawn points closer than this (meters) to a live vehicle are skipped on respawn
+SPAWN_FAILURE_COOLDOWN = 10.0  # Seconds a spawn point is skipped after a failed SpawnActor
+RESPAWN_INTERVAL = 5.0  # Seconds between respawn rounds, independent of the health check interval
+
 PRESERVED_CLEANUP_ROLES = (
     "hero",
     "external_ego",
@@ -29,6 +38,17 @@ PRESERVED_CLEANUP_ROLES = (
 )
 
 
+def _env_float(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"[x] Invalid {name}={value!r}; using {default}")
+        return default
+
+
 def get_actor_blueprints(world, bp_filter, generation):
     bps = world.get_blueprint_library().filter(bp_filter)
 
@@ -56,6 +76,9 @@ def get_actor_blueprints(world, bp_filter, generation):
 class TrafficTelemetryPublisher(Telemetry):
     TRAFFIC_MESSAGE_TYPE = 2
     PUBLISH_INTERVAL = 1.0 / 30.0
+    PUBLISH_MODE_INTERVAL = "interval"
+    PUBLISH_MODE_TICK = "tick"
+    TICK_WAIT_TIMEOUT = 0.1
 
     def __init__(self, world):
         super().__init__()
@@ -65,7 +88,37 @@ class TrafficTelemetryPublisher(Telemetry):
         self._world_lock = threading.Lock()
         self._manual_role_name = os.environ.get("UB_MANUAL_ROLE_NAME", "manual_vehicle")
         self._logged_manual_actor_ids = set()
-        print(f"[!] Traffic telemetry publish rate: {publish_hz:.1f} Hz")
+        self._actor_metadata = {}  # {actor_id: static vehicle metadata, or None for non-vehicles}
+        self._publish_mode = self._get_publish_mode()
+        self._publish_decimation = self._get_publish_decimation()
+        self._tick_condition = threading.Condition()
+        self._pending_snapshot = None
+        self._last_enqueued_frame = None
+        self._last_published_frame = None
+        self._dropped_tick_count = 0
+        self._duplicate_tick_count = 0
+        if self._publish_mode == self.PUBLISH_MODE_TICK:
+            print(f"[!] Traffic telemetry publishing on every {self._publish_decimation} simulation tick(s)")
+        else:
+            print(f"[!] Traffic telemetry publish rate: {publish_hz:.1f} Hz")
+
+    def _get_publish_mode(self):
+        raw_value = os.environ.get("UB_TRAFFIC_PUBLISH_MODE", self.PUBLISH_MODE_INTERVAL).strip().lower()
+        if raw_value in (self.PUBLISH_MODE_INTERVAL, self.PUBLISH_MODE_TICK):
+            return raw_value
+        print(f"[x] Invalid UB_TRAFFIC_PUBLISH_MODE={raw_value!r}; using {self.PUBLISH_MODE_INTERVAL!r}")
+        return self.PUBLISH_MODE_INTERVAL
+
+    def _get_publish_decimation(self):
+        raw_value = os.environ.get("UB_TRAFFIC_PUBLISH_DECIMATION", "1")
+        try:
+            decimation = int(raw_value)
+        except ValueError:
+            decimation = 0
+        if decimation < 1:
+            print(f"[x] Invalid UB_TRAFFIC_PUBLISH_DECIMATION={raw_value!r}; using 1")
+            return 1
+        return decimation
 
     def _get_publish_hz(self):
         raw_value = os.environ.get("UB_TRAFFIC_PUBLISH_HZ", "60")
@@ -82,24 +135,122 @@ class TrafficTelemetryPublisher(Telemetry):
     def handle_fetch_telemetry_data(self):
         with self._world_lock:
             snapshot = self._world.get_snapshot()
-            vehicles = self._world.get_actors().filter("vehicle.*")
+            self._refresh_actor_metadata(snapshot)
+
+        return self._build_traffic_message(snapshot)
+
+    def _telemetry_publisher(self):
+        if self._publish_mode != self.PUBLISH_MODE_TICK:
+            super()._telemetry_publisher()
+            return
+
+        callback_id = self._world.on_tick(self._on_world_tick)
+        try:
+            while not self._should_stop_publisher:
+                snapshot = self._next_tick_snapshot()
+                if snapshot is None:
+                    continue
+                try:
+                    with self._world_lock:
+                        self._refresh_actor_metadata(snapshot)
+                    message = self._create_message(self._build_traffic_message(snapshot))
+                    self.redis_client.publish(self.CHANNEL, message)
+                    self._last_published_frame = snapshot.frame
+
+                    self.logger.log_sent(message)
+                except Exception as e:
+                    print(f"[x] Publisher error: {e}")
+        finally:
+            self._world.remove_on_tick(callback_id)
+            print(
+                "[!] Tick publisher stopped: "
+                f"last_frame={self._last_published_frame} "
+                f"dropped={self._dropped_tick_count} duplicates={self._duplicate_tick_count}"
+            )
+
+    def _on_world_tick(self, snapshot):
+        # Runs on the CARLA client callback thread: only hand the snapshot over,
+        # encoding and publishing happen on the publisher thread.
+        frame = snapshot.frame
+        with self._tick_condition:
+            if self._last_enqueued_frame is not None:
+                if frame <= self._last_enqueued_frame:
+                    self._duplicate_tick_count += 1
+                    return
+                if frame - self._last_enqueued_frame < self._publish_decimation:
+                    return
+            if self._pending_snapshot is not None:
+                self._dropped_tick_count += 1
+            self._pending_snapshot = snapshot
+            self._last_enqueued_frame = frame
+            self._tick_condition.notify()
+
+    def _next_tick_snapshot(self):
+        with self._tick_condition:
+            if self._pending_snapshot is None:
+                self._tick_condition.wait(self.TICK_WAIT_TIMEOUT)
+            snapshot = self._pending_snapshot
+            self._pending_snapshot = None
+            return snapshot
+
+    def _refresh_actor_metadata(self, snapshot):
+        """Fetch static metadata only for actors spawned since the last snapshot.
+
+        Poses come from the snapshot itself, so steady-state sampling costs a
+        single ``get_snapshot`` RPC regardless of the traffic count. Ids the
+        client cannot resolve yet are not cached and are retried next frame.
+        """
+        snapshot_ids = {actor_snapshot.id for actor_snapshot in snapshot}
+        for actor_id in self._actor_metadata.keys() - snapshot_ids:
+            del self._actor_metadata[actor_id]
+
+        new_ids = [actor_id for actor_id in snapshot_ids if actor_id not in self._actor_metadata]
+        if not new_ids:
+            return
+
+        for actor in self._world.get_actors(new_ids):
+            if not actor.type_id.startswith("vehicle."):
+                self._actor_metadata[actor.id] = None
+                continue
+            role_name = actor.attributes.get("role_name", "")
+            self._actor_metadata[actor.id] = {
+                "id": str(actor.id),
+                "role_name": role_name,
+                "blueprint": actor.type_id,
+                "color": actor.attributes.get("color", "255,255,255"),
+            }
+            if role_name == self._manual_role_name and actor.id not in self._logged_manual_actor_ids:
+                print(f"[!] Publishing manual traffic actor id={actor.id} role_name={role_name}")
+                self._logged_manual_actor_ids.add(actor.id)
+
+    def get_vehicle_ids(self, snapshot):
+        """Return the ids of the vehicles in ``snapshot``, ego and manual actors included.
+
+        Uses the metadata cache, so only actors not seen before cost an RPC.
+        """
+        with self._world_lock:
+            self._refresh_actor_metadata(snapshot)
+            return [
+                actor_snapshot.id for actor_snapshot in snapshot
+                if self._actor_metadata.get(actor_snapshot.id) is not None
+            ]
 
+    def _build_traffic_message(self, snapshot):
         server_timestamp = float(snapshot.timestamp.elapsed_seconds)
         server_frame = int(snapshot.frame)
+        with self._world_lock:
+            actor_metadata = [
+                (actor_snapshot, self._actor_metadata.get(actor_snapshot.id))
+                for actor_snapshot in snapshot
+            ]
+
         messages = []
-        for vehicle in vehicles:
-            role_name = vehicle.attributes.get("role_name", "")
-            if role_name in ("hero", "external_ego"):
+        for actor_snapshot, metadata in actor_metadata:
+            if metadata is None or metadata["role_name"] in ("hero", "external_ego"):
                 continue
-            transform = vehicle.get_transform()
-            if role_name == self._manual_role_name and vehicle.id not in self._logged_manual_actor_ids:
-                print(f"[!] Publishing manual traffic actor id={vehicle.id} role_name={role_name}")
-                self._logged_manual_actor_ids.add(vehicle.id)
+            transform = actor_snapshot.get_transform()
             messages.append({
-                "id": str(vehicle.id),
-                "role_name": role_name,
-                "blueprint": vehicle.type_id,
-                "color": vehicle.attributes.get("color", "255,255,255"),
+                **metadata,
                 "server_timestamp": server_timestamp,
                 "server_frame": server_frame,
                 "location": {
@@ -462,96 +613,101 @@ def main():
         # Example of how to use Traffic Manager parameters
         traffic_manager.global_percentage_speed_difference(30.0)
 
-        RESPAWN_CHECK_INTERVAL = 5.0
-        FALL_OFF_Z_THRESHOLD = -10.0
-        STUCK_DISTANCE_THRESHOLD = 1.0  # Minimum distance (meters) a vehicle must move between checks
-        STUCK_CHECKS_BEFORE_DESTROY = 3  # Number of consecutive stuck checks before destroying
-        last_respawn_check = time.time()
-        vehicle_last_positions = {}  # {vehicle_id: (x, y, z)}
-        vehicle_stuck_counts = {}   # {vehicle_id: consecutive_stuck_count}
+        health_check_interval = _env_float("UB_TRAFFIC_HEALTH_CHECK_INTERVAL", 0.0)
+        fleet_health = FleetHealthMonitor(
+            (bbox_x_min, bbox_y_min, bbox_x_max, bbox_y_max),
+            fall_off_z=FALL_OFF_Z_THRESHOLD,
+            stuck_distance=STUCK_DISTANCE_THRESHOLD,
+            stuck_seconds=_env_float("UB_TRAFFIC_STUCK_SECONDS", STUCK_SECONDS),
+        )
+        fleet_health.track(vehicles_list)
+        spawn_point_manager = SpawnPointManager(
+            vehicle_spawn_points,
+            clearance=_env_float("UB_TRAFFIC_SPAWN_CLEARANCE_M", SPAWN_CLEARANCE),
+            cooldown_seconds=_env_float("UB_TRAFFIC_SPAWN_COOLDOWN_SECONDS", SPAWN_FAILURE_COOLDOWN),
+        )
+        respawn_interval = _env_float("UB_TRAFFIC_RESPAWN_INTERVAL", RESPAWN_INTERVAL)
+        last_health_check = time.time()
+        last_respawn = time.time()
 
         while True:
             if not args.asynch and synchronous_master:
                 with telemetry_publisher._world_lock:
                     world.tick()
+                snapshot = None
             else:
-                world.wait_for_tick()
+                snapshot = world.wait_for_tick()
 
-            # Periodically check for missing/fallen vehicles and respawn
+            # Check fleet health (every tick by default); respawns run on their own interval
             now = time.time()
-            if now - last_respawn_check < RESPAWN_CHECK_INTERVAL:
+            if now - last_health_check < health_check_interval:
                 continue
-            last_respawn_check = now
-
-            # Find alive vehicles that are still within bounds and not stuck
-            with telemetry_publisher._world_lock:
-                alive_actors = world.get_actors(vehicles_list)
-            healthy_ids = set()
-            remove_ids = []
-            for actor in alive_actors:
-                loc = actor.get_location()
-                aid = actor.id
-                if loc.z < FALL_OFF_Z_THRESHOLD:
-                    remove_ids.append(aid)
-                elif not (bbox_x_min <= loc.x <= bbox_x_max and bbox_y_min <= loc.y <= bbox_y_max):
-                    remove_ids.append(aid)
-                else:
-                    # Check if vehicle is stuck
-                    if aid in vehicle_last_positions:
-                        last_x, last_y, last_z = vehicle_last_positions[aid]
-                        dist = ((loc.x - last_x)**2 + (loc.y - last_y)**2 + (loc.z - last_z)**2)**0.5
-                        if dist < STUCK_DISTANCE_THRESHOLD:
-                            vehicle_stuck_counts[aid] = vehicle_stuck_counts.get(aid, 0) + 1
-                        else:
-                            vehicle_stuck_counts[aid] = 0
-                    vehicle_last_positions[aid] = (loc.x, loc.y, loc.z)
-
-                    if vehicle_stuck_counts.get(aid, 0) >= STUCK_CHECKS_BEFORE_DESTROY:
-                        remove_ids.append(aid)
-                        logging.info('Vehicle %d stuck for %d checks, destroying', aid, vehicle_stuck_counts[aid])
-                    else:
-                        healthy_ids.add(aid)
+            last_health_check = now
+
+            if snapshot is None:
+                with telemetry_publisher._world_lock:
+                    snapshot = world.get_snapshot()
+            health = fleet_health.evaluate(snapshot)
 
             # Destroy unhealthy vehicles (out-of-bounds, fallen, stuck)
-            alive_actor_ids = {actor.id for actor in alive_actors}
-            missing_ids = [vid for vid in vehicles_list if vid not in alive_actor_ids]
+            remove_ids = health["fallen"] + health["out_of_bounds"] + health["stuck"]
+            missing_ids = health["missing"]
             if remove_ids:
                 client.apply_batch([DestroyActor(x) for x in remove_ids])
-                logging.info('Destroyed %d unhealthy vehicles', len(remove_ids))
+                logging.info(
+                    'Destroyed %d unhealthy vehicles (fallen=%d, out_of_bounds=%d, stuck=%d)',
+                    len(remove_ids), len(health["fallen"]), len(health["out_of_bounds"]), len(health["stuck"]))
             if missing_ids:
                 logging.info('Detected %d already-destroyed vehicles', len(missing_ids))
+            spawn_point_manager.release(remove_ids + missing_ids)
 
-            # Clean up tracking dicts for removed vehicles
-            for vid in remove_ids + missing_ids:
-                vehicle_last_positions.pop(vid, None)
-                vehicle_stuck_counts.pop(vid, None)
-
-            vehicles_list = [vid for vid in vehicles_list if vid in healthy_ids]
+            vehicles_list = fleet_health.tracked_ids()
             vehicles_to_spawn = target_vehicle_count - len(vehicles_list)
+            if vehicles_to_spawn <= 0 or now - last_respawn < respawn_interval:
+                continue
+            last_respawn = now
+
+            # Mask spawn points near any live vehicle (including ego/manual actors)
+            live_ids = telemetry_publisher.get_vehicle_ids(snapshot)
+            live_positions = []
+            for vid in live_ids:
+                location = snapshot.find(vid).get_transform().location
+                live_positions.append((location.x, location.y, location.z))
+            spawn_point_manager.update_occupancy(live_positions, live_ids)
+
+            respawn_batch = []
+            respawn_indices = []
+            for index, respawn_point in spawn_point_manager.select(vehicles_to_spawn, now, random):
+                bp = random.choice(blueprints)
+                if bp.has_attribute('color'):
+                    bp.set_attribute('color', random.choice(bp.get_attribute('color').recommended_values))
+                if bp.has_attribute('driver_id'):
+                    bp.set_attribute('driver_id', random.choice(bp.get_attribute('driver_id').recommended_values))
+                bp.set_attribute('role_name', 'autopilot')
+                respawn_batch.append(SpawnActor(bp, respawn_point)
+                    .then(SetAutopilot(FutureActor, True, traffic_manager.get_port())))
+                respawn_indices.append(index)
+
+            if not respawn_batch:
+                logging.debug('No free spawn points for %d pending respawns', vehicles_to_spawn)
+                continue
 
-            if vehicles_to_spawn > 0:
-                respawn_batch = []
-                respawn_points = list(vehicle_spawn_points)
-                random.shuffle(respawn_points)
-                for i in range(min(vehicles_to_spawn, len(respawn_points))):
-                    bp = random.choice(blueprints)
-                    if bp.has_attribute('color'):
-                        bp.set_attribute('color', random.choice(bp.get_attribute('color').recommended_values))
-                    if bp.has_attribute('driver_id'):
-                        bp.set_attribute('driver_id', random.choice(bp.get_attribute('driver_id').recommended_values))
-                    bp.set_attribute('role_name', 'autopilot')
-                    respawn_batch.append(SpawnActor(bp, respawn_points[i])
-                        .then(SetAutopilot(FutureActor, True, traffic_manager.get_port())))
-
-                for response in client.apply_batch_sync(respawn_batch, synchronous_master):
-                    if response.error:
-                        logging.error(response.error)
-                    else:
-                        vehicles_list.append(response.actor_id)
-
-                respawned = len(vehicles_list) - (target_vehicle_count - vehicles_to_spawn)
-                if respawned > 0:
-                    logging.info('Respawned %d vehicles (total: %d/%d)', respawned, len(vehicles_list), target_vehicle_count)
+            # Never tick here: in synchronous mode the loop's own tick (under the world lock)
+            # advances the frame that adds the new vehicles.
+            responses = client.apply_batch_sync(respawn_batch, False)
+            for index, response in zip(respawn_indices, responses):
+                spawn_point_manager.report(index, not response.error, now, response.actor_id)
+                if response.error:
+                    logging.debug(response.error)
+                else:
+                    vehicles_list.append(response.actor_id)
+                    fleet_health.track([response.actor_id], snapshot.frame)
+
+            respawned = len(vehicles_list) - (target_vehicle_count - vehicles_to_spawn)
+            logging.info(
+                'Respawned %d/%d vehicles (total: %d/%d, spawn success rate %.0f%%)',
+                respawned, len(respawn_batch), len(vehicles_list), target_vehicle_count,
+                100.0 * spawn_point_manager.success_rate)
 
     finally:
         if telemetry_publisher:
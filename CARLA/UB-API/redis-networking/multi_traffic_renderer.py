@@ -8,6 +8,13 @@ from collections import deque
 
 import carla
 
+from pose_smoothing import (
+    frame_scaled_alpha,
+    lerp,
+    lerp_angle_degrees,
+    normalize_angle_degrees,
+    select_render_sample,
+)
 from telemetry import Telemetry
 
 # Utility to convert location dict to CARLA location
@@ -51,23 +58,11 @@ def _env_choice(name, default, choices):
     return default
 
 
-def _normalize_angle_degrees(angle):
-    return (angle + 180.0) % 360.0 - 180.0
-
-
-def _lerp(a, b, alpha):
-    return a + (b - a) * alpha
-
-
-def _lerp_angle_degrees(a, b, alpha):
-    return _normalize_angle_degrees(a + _normalize_angle_degrees(b - a) * alpha)
-
-
 def _lerp_location(a, b, alpha):
     return carla.Location(
-        x=_lerp(a.x, b.x, alpha),
-        y=_lerp(a.y, b.y, alpha),
-        z=_lerp(a.z, b.z, alpha),
+        x=lerp(a.x, b.x, alpha),
+        y=lerp(a.y, b.y, alpha),
+        z=lerp(a.z, b.z, alpha),
     )
 
 
@@ -93,91 +88,21 @@ def _sample_to_transform(sample):
     )
 
 
-def _interpolate_samples(before, after, target_time):
-    dt = after["timestamp"] - before["timestamp"]
-    if dt <= 1e-6:
-        return dict(after)
-
-    alpha = max(0.0, min(1.0, (target_time - before["timestamp"]) / dt))
-    sample = dict(after)
-    sample.update({
-        "timestamp": target_time,
-        "x": _lerp(before["x"], after["x"], alpha),
-        "y": _lerp(before["y"], after["y"], alpha),
-        "z": _lerp(before["z"], after["z"], alpha),
-        "yaw": _lerp_angle_degrees(before["yaw"], after["yaw"], alpha),
-    })
-    return sample
-
-
-def _extrapolate_sample(previous, latest, target_time, max_extrapolation_seconds):
-    if previous is None:
-        return dict(latest)
-
-    sample_dt = latest["timestamp"] - previous["timestamp"]
-    if sample_dt <= 1e-6:
-        return dict(latest)
-
-    extrapolation_dt = min(
-        max(0.0, target_time - latest["timestamp"]),
-        max_extrapolation_seconds,
-    )
-    sample = dict(latest)
-    sample.update({
-        "timestamp": latest["timestamp"] + extrapolation_dt,
-        "x": latest["x"] + ((latest["x"] - previous["x"]) / sample_dt) * extrapolation_dt,
-        "y": latest["y"] + ((latest["y"] - previous["y"]) / sample_dt) * extrapolation_dt,
-        "z": latest["z"] + ((latest["z"] - previous["z"]) / sample_dt) * extrapolation_dt,
-        "yaw": _normalize_angle_degrees(
-            latest["yaw"]
-            + (_normalize_angle_degrees(latest["yaw"] - previous["yaw"]) / sample_dt)
-            * extrapolation_dt
-        ),
-    })
-    return sample
-
-
-def _select_render_sample(samples, target_time, max_extrapolation_seconds):
-    if not samples:
-        return None
-    if len(samples) == 1:
-        return dict(samples[0])
-
-    if target_time <= samples[0]["timestamp"]:
-        return dict(samples[0])
-
-    for index in range(1, len(samples)):
-        before = samples[index - 1]
-        after = samples[index]
-        if target_time <= after["timestamp"]:
-            return _interpolate_samples(before, after, target_time)
-
-    return _extrapolate_sample(samples[-2], samples[-1], target_time, max_extrapolation_seconds)
-
-
 def _blend_transforms(current, target, alpha):
     return carla.Transform(
         carla.Location(
-            x=_lerp(current.location.x, target.location.x, alpha),
-            y=_lerp(current.location.y, target.location.y, alpha),
-            z=_lerp(current.location.z, target.location.z, alpha),
+            x=lerp(current.location.x, target.location.x, alpha),
+            y=lerp(current.location.y, target.location.y, alpha),
+            z=lerp(current.location.z, target.location.z, alpha),
         ),
         carla.Rotation(
-            pitch=_lerp(current.rotation.pitch, target.rotation.pitch, alpha),
-            yaw=_lerp_angle_degrees(current.rotation.yaw, target.rotation.yaw, alpha),
-            roll=_lerp(current.rotation.roll, target.rotation.roll, alpha),
+            pitch=lerp(current.rotation.pitch, target.rotation.pitch, alpha),
+            yaw=lerp_angle_degrees(current.rotation.yaw, target.rotation.yaw, alpha),
+            roll=lerp(current.rotation.roll, target.rotation.roll, alpha),
         ),
     )
 
 
-def _frame_scaled_alpha(alpha, dt, reference_hz=60.0):
-    alpha = max(0.0, min(1.0, alpha))
-    if alpha <= 0.0 or alpha >= 1.0:
-        return alpha
-    reference_dt = 1.0 / reference_hz
-    return 1.0 - ((1.0 - alpha) ** max(0.0, dt / reference_dt))
-
-
 class MultiTrafficRenderer(Telemetry):
     TRAFFIC_MESSAGE_TYPE = 2
     SILENCE_DURATION = 5.0
@@ -270,6 +195,7 @@ class MultiTrafficRenderer(Telemetry):
         self._observed_roles = {}
         self._server_time_offset = None
         self._snapped_camera_traffic_ids = set()
+        self._spectator = None
         self._camera_transform = None
         self._camera_desired_transform = None
         self._camera_anchor_location = None
@@ -450,7 +376,7 @@ class MultiTrafficRenderer(Telemetry):
             z=4.0,
         )
         rotation = carla.Rotation(pitch=-15.0, yaw=transform.rotation.yaw, roll=0.0)
-        self.world.get_spectator().set_transform(carla.Transform(location, rotation))
+        self._get_spectator().set_transform(carla.Transform(location, rotation))
 
     def _smooth_update_spectator(self, target_transform, dt):
         self._update_camera_anchor(target_transform, dt)
@@ -468,7 +394,7 @@ class MultiTrafficRenderer(Telemetry):
             self._set_spectator_transform(desired)
             return
 
-        alpha = _frame_scaled_alpha(self.camera_smoothing, dt)
+        alpha = frame_scaled_alpha(self.camera_smoothing, dt)
         self._set_spectator_transform(_blend_transforms(self._camera_transform, desired, alpha))
 
     def _update_camera_anchor(self, target_transform, dt):
@@ -488,17 +414,17 @@ class MultiTrafficRenderer(Telemetry):
 
         position_delta = _location_distance(self._camera_anchor_location, target_location)
         if position_delta >= position_deadband:
-            position_alpha = _frame_scaled_alpha(position_smoothing, dt)
+            position_alpha = frame_scaled_alpha(position_smoothing, dt)
             self._camera_anchor_location = _lerp_location(
                 self._camera_anchor_location,
                 target_location,
                 position_alpha,
             )
 
-        yaw_delta = abs(_normalize_angle_degrees(target_yaw - self._camera_anchor_yaw))
+        yaw_delta = abs(normalize_angle_degrees(target_yaw - self._camera_anchor_yaw))
         if yaw_delta >= yaw_deadband:
-            yaw_alpha = _frame_scaled_alpha(yaw_smoothing, dt)
-            self._camera_anchor_yaw = _lerp_angle_degrees(
+            yaw_alpha = frame_scaled_alpha(yaw_smoothing, dt)
+            self._camera_anchor_yaw = lerp_angle_degrees(
                 self._camera_anchor_yaw,
                 target_yaw,
                 yaw_alpha,
@@ -516,9 +442,15 @@ class MultiTrafficRenderer(Telemetry):
         return min(80.0, max(0.0, speed))
 
     def _set_spectator_transform(self, transform):
-        self.world.get_spectator().set_transform(transform)
+        self._get_spectator().set_transform(transform)
         self._camera_transform = transform
 
+    def _get_spectator(self):
+        # The spectator actor never changes within an episode; fetching it costs an RPC per frame.
+        if self._spectator is None:
+            self._spectator = self.world.get_spectator()
+        return self._spectator
+
     def _reset_camera_state(self):
         self._camera_transform = None
         self._camera_desired_transform = None
@@ -622,7 +554,7 @@ class MultiTrafficRenderer(Telemetry):
         target_time = time.time() - self.interpolation_delay
         with self._state_lock:
             render_samples = {
-                traffic_id: _select_render_sample(
+                traffic_id: select_render_sample(
                     list(samples),
                     target_time,
                     self.max_extrapolation,
@@ -647,7 +579,7 @@ class MultiTrafficRenderer(Telemetry):
                     visual_transform = self.actor_transforms.get(traffic_id, transform)
             else:
                 vehicle = self.traffic_vehicles[traffic_id]
-                alpha = _frame_scaled_alpha(self.actor_smoothing, dt)
+                alpha = frame_scaled_alpha(self.actor_smoothing, dt)
                 visual_transform = _blend_transforms(visual_transform, transform, alpha)
                 vehicle.set_transform(visual_transform)
                 self.actor_transforms[traffic_id] = visual_transform
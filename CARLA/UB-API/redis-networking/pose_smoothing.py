@@ -0,0 +1,86 @@
+"""Pose sample interpolation shared by the Redis traffic renderer and UDP bridge.
+
+Samples are dicts carrying at least ``timestamp``, ``x``, ``y``, ``z`` and ``yaw``.
+"""
+
+
+def normalize_angle_degrees(angle):
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+def lerp(a, b, alpha):
+    return a + (b - a) * alpha
+
+
+def lerp_angle_degrees(a, b, alpha):
+    return normalize_angle_degrees(a + normalize_angle_degrees(b - a) * alpha)
+
+
+def interpolate_samples(before, after, target_time):
+    dt = after["timestamp"] - before["timestamp"]
+    if dt <= 1e-6:
+        return dict(after)
+
+    alpha = max(0.0, min(1.0, (target_time - before["timestamp"]) / dt))
+    sample = dict(after)
+    sample.update({
+        "timestamp": target_time,
+        "x": lerp(before["x"], after["x"], alpha),
+        "y": lerp(before["y"], after["y"], alpha),
+        "z": lerp(before["z"], after["z"], alpha),
+        "yaw": lerp_angle_degrees(before["yaw"], after["yaw"], alpha),
+    })
+    return sample
+
+
+def extrapolate_sample(previous, latest, target_time, max_extrapolation_seconds):
+    if previous is None:
+        return dict(latest)
+
+    sample_dt = latest["timestamp"] - previous["timestamp"]
+    if sample_dt <= 1e-6:
+        return dict(latest)
+
+    extrapolation_dt = min(
+        max(0.0, target_time - latest["timestamp"]),
+        max_extrapolation_seconds,
+    )
+    sample = dict(latest)
+    sample.update({
+        "timestamp": latest["timestamp"] + extrapolation_dt,
+        "x": latest["x"] + ((latest["x"] - previous["x"]) / sample_dt) * extrapolation_dt,
+        "y": latest["y"] + ((latest["y"] - previous["y"]) / sample_dt) * extrapolation_dt,
+        "z": latest["z"] + ((latest["z"] - previous["z"]) / sample_dt) * extrapolation_dt,
+        "yaw": normalize_angle_degrees(
+            latest["yaw"]
+            + (normalize_angle_degrees(latest["yaw"] - previous["yaw"]) / sample_dt)
+            * extrapolation_dt
+        ),
+    })
+    return sample
+
+
+def select_render_sample(samples, target_time, max_extrapolation_seconds):
+    if not samples:
+        return None
+    if len(samples) == 1:
+        return dict(samples[0])
+
+    if target_time <= samples[0]["timestamp"]:
+        return dict(samples[0])
+
+    for index in range(1, len(samples)):
+        before = samples[index - 1]
+        after = samples[index]
+        if target_time <= after["timestamp"]:
+            return interpolate_samples(before, after, target_time)
+
+    return extrapolate_sample(samples[-2], samples[-1], target_time, max_extrapolation_seconds)
+
+
+def frame_scaled_alpha(alpha, dt, reference_hz=60.0):
+    alpha = max(0.0, min(1.0, alpha))
+    if alpha <= 0.0 or alpha >= 1.0:
+        return alpha
+    reference_dt = 1.0 / reference_hz
+    return 1.0 - ((1.0 - alpha) ** max(0.0, dt / reference_dt))
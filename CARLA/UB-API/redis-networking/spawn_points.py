@@ -0,0 +1,113 @@
+import numpy as np
+
+
+class SpawnPointManager:
+    """Uniform grid index over vehicle spawn points for respawn selection.
+
+    Spawn points within ``clearance`` meters of a live vehicle are masked as
+    occupied, and points whose ``SpawnActor`` failed are put on a cooldown, so
+    respawn batches only target points that are likely to succeed. A point that
+    was just spawned on stays occupied until a snapshot contains the new vehicle
+    or the vehicle is released, as snapshots can lag behind the spawn.
+    """
+
+    def __init__(self, spawn_points, clearance=5.0, cooldown_seconds=10.0):
+        if clearance <= 0.0:
+            raise ValueError(f"Spawn clearance must be positive, got {clearance!r}")
+
+        self.spawn_points = list(spawn_points)
+        self.clearance = clearance
+        self.cooldown_seconds = cooldown_seconds
+
+        self._locations = np.array(
+            [(sp.location.x, sp.location.y, sp.location.z) for sp in self.spawn_points],
+            dtype=float,
+        ).reshape(-1, 3)
+        self._occupied = np.zeros(len(self.spawn_points), dtype=bool)
+        self._cooldown_until = np.zeros(len(self.spawn_points))
+        self._reservations = {}  # {actor_id: spawn point index} not yet confirmed by a snapshot
+        self._grid = {}  # {(cell_x, cell_y): np.array of spawn point indices}
+        for index, cell in enumerate(self._cells(self._locations)):
+            self._grid.setdefault(cell, []).append(index)
+        self._grid = {cell: np.array(indices) for cell, indices in self._grid.items()}
+
+        self.attempts = 0
+        self.successes = 0
+
+    def __len__(self):
+        return len(self.spawn_points)
+
+    @property
+    def success_rate(self):
+        return self.successes / self.attempts if self.attempts else 1.0
+
+    def update_occupancy(self, positions, confirmed_ids=()):
+        """Mark spawn points within ``clearance`` of any of the ``(N, 3)`` ``positions``.
+
+        ``confirmed_ids`` are the vehicles present in the snapshot ``positions``
+        come from; their reservations are dropped, as their positions now count.
+        Points reserved by vehicles not confirmed yet stay occupied.
+        """
+        for actor_id in confirmed_ids:
+            self._reservations.pop(actor_id, None)
+        self._occupied[:] = False
+        if self._reservations:
+            self._occupied[list(self._reservations.values())] = True
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        if not len(positions) or not len(self.spawn_points):
+            return
+
+        clearance_sq = self.clearance * self.clearance
+        for cell, vehicle_indices in self._group_by_cell(positions).items():
+            candidates = self._neighbour_points(cell)
+            if candidates is None:
+                continue
+            deltas = self._locations[candidates, None, :] - positions[None, vehicle_indices, :]
+            too_close = (deltas * deltas).sum(axis=2).min(axis=1) < clearance_sq
+            self._occupied[candidates[too_close]] = True
+
+    def select(self, count, now, rng=np.random):
+        """Return up to ``count`` ``(index, transform)`` pairs drawn from free points."""
+        free = np.flatnonzero(~self._occupied & (self._cooldown_until <= now))
+        if not len(free):
+            return []
+        chosen = rng.choice(free, size=min(count, len(free)), replace=False)
+        self._occupied[chosen] = True
+        return [(int(index), self.spawn_points[index]) for index in chosen]
+
+    def report(self, index, success, now, actor_id=None):
+        self.attempts += 1
+        if success:
+            self.successes += 1
+            if actor_id is not None:
+                self._reservations[actor_id] = index
+        else:
+            self._cooldown_until[index] = now + self.cooldown_seconds
+
+    def release(self, actor_ids):
+        """Drop the reservations of vehicles that were destroyed before being confirmed."""
+        for actor_id in actor_ids:
+            self._reservations.pop(actor_id, None)
+
+    def _cells(self, locations):
+        cells = np.floor(locations[:, :2] / self.clearance).astype(np.int64)
+        return [tuple(cell) for cell in cells]
+
+    def _group_by_cell(self, positions):
+        groups = {}
+        for index, cell in enumerate(self._cells(positions)):
+            groups.setdefault(cell, []).append(index)
+        return groups
+
+    def _neighbour_points(self, cell):
+        cell_x, cell_y = cell
+        indices = [
+            self._grid[neighbour]
+            for neighbour in (
+                (cell_x + dx, cell_y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+            )
+            if neighbour in self._grid
+        ]
+        if not indices:
+            return None
+        return np.concatenate(indices)
@@ -1,13 +1,19 @@
 #!/usr/bin/env python
 
 import json
+import math
 import os
+import select
 import socket
 import threading
 import time
+from collections import deque
+
 import redis
 import carla
 
+from pose_smoothing import select_render_sample
+
 CONFIG_FILE = "telemetry.conf"
 
 DEFAULT_REDIS_HOST = "localhost"
@@ -25,11 +31,23 @@ DEFAULT_EGO_ID = "ub-mr-ego"
 DEFAULT_EGO_BLUEPRINT = "vehicle.lincoln.mkz_2020"
 DEFAULT_EGO_COLOR = "0,0,255"
 DEFAULT_EGO_TIMEOUT = 2.0
+DEFAULT_EGO_PUBLISH_HZ = 60.0
+DEFAULT_EGO_INTERPOLATION_DELAY_MS = 50.0
+DEFAULT_EGO_MAX_EXTRAPOLATION_MS = 100.0
+DEFAULT_EGO_RENDER_HZ = 60.0
 DEFAULT_CARLA_TIMEOUT = 10.0
+DEFAULT_BRIDGE_QUEUE_SIZE = 1
+DEFAULT_BRIDGE_STATS_INTERVAL = 5.0
+DEFAULT_BRIDGE_STATS_KEY = "carla:bridge:stats"
 
 TRAFFIC_MESSAGE_TYPE = 2
 EGO_MESSAGE_TYPE = 3
 EGO_ROLE_NAME = "external_ego"
+STAGE_LATENCY_BUFFER_SIZE = 100
+STAGE_POLL_INTERVAL = 0.1
+UDP_RECEIVE_BUFFER_SIZE = 65535
+SEQUENCE_RESET_WINDOW = 1000
+EGO_SAMPLE_HISTORY_SECONDS = 2.0
 
 
 def _load_json_config():
@@ -72,45 +90,185 @@ def _get_config_float(config, env_name, config_name, default):
         return default
 
 
+class LatestValueQueue:
+    """Bounded hand-off between bridge stages that drops the oldest item instead of blocking."""
+
+    def __init__(self, name, maxsize=DEFAULT_BRIDGE_QUEUE_SIZE):
+        self.name = name
+        self.dropped = 0
+        self._items = deque(maxlen=max(1, maxsize))
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
+
+    def put(self, item):
+        with self._condition:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append((time.time(), item))
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Return ``(enqueue_time, item)`` or ``None`` on timeout/close."""
+        with self._condition:
+            if not self._items and not self._closed:
+                self._condition.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class StageStats:
+    """Rolling latency counters for one bridge stage."""
+
+    def __init__(self, name, queue=None):
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.errors = 0
+        self._counters = {}
+        self._wait_times = deque(maxlen=STAGE_LATENCY_BUFFER_SIZE)
+        self._process_times = deque(maxlen=STAGE_LATENCY_BUFFER_SIZE)
+        self._lock = threading.Lock()
+
+    def record(self, process_seconds, wait_seconds=0.0):
+        with self._lock:
+            self.processed += 1
+            self._process_times.append(process_seconds)
+            self._wait_times.append(wait_seconds)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def increment(self, name, count=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + count
+
+    def set_value(self, name, value):
+        with self._lock:
+            self._counters[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            process_times = list(self._process_times)
+            wait_times = list(self._wait_times)
+            stats = {
+                "processed": self.processed,
+                "errors": self.errors,
+                **self._counters,
+            }
+
+        stats["avg_latency_ms"] = _average_ms(process_times)
+        stats["max_latency_ms"] = max(process_times) * 1000 if process_times else 0.0
+        stats["avg_queue_wait_ms"] = _average_ms(wait_times)
+        if self.queue is not None:
+            stats["queue_depth"] = len(self.queue)
+            stats["queue_dropped"] = self.queue.dropped
+        return stats
+
+
+def _average_ms(values):
+    if not values:
+        return 0.0
+    return sum(values) / len(values) * 1000
+
+
 class CarlaEgoMirror:
-    def __init__(self, host, port, timeout, ego_timeout):
+    """Mirrors the UB-MR ego into CARLA from a buffered, interpolated pose stream.
+
+    ``update`` only records timestamped samples; a render thread paced by
+    ``world.wait_for_tick`` replays them ``interpolation_delay`` seconds in the
+    past (extrapolating up to ``max_extrapolation`` when packets are late), so
+    network jitter does not reach CARLA as teleport stutter.
+    """
+
+    def __init__(
+        self,
+        host,
+        port,
+        timeout,
+        ego_timeout,
+        interpolation_delay=DEFAULT_EGO_INTERPOLATION_DELAY_MS / 1000.0,
+        max_extrapolation=DEFAULT_EGO_MAX_EXTRAPOLATION_MS / 1000.0,
+        update_hz=DEFAULT_EGO_RENDER_HZ,
+        stats=None,
+    ):
         self._client = carla.Client(host, port)
         self._client.set_timeout(timeout)
         self._world = self._client.get_world()
         self._ego_timeout = ego_timeout
+        self._interpolation_delay = max(0.0, interpolation_delay)
+        self._max_extrapolation = max(0.0, max_extrapolation)
+        self._update_hz = max(1.0, update_hz)
+        self._stats = stats
         self._actor = None
         self._actor_blueprint = None
         self._last_update = 0.0
+        self._samples = deque()
+        self._state_lock = threading.Lock()
+        self._position_errors = deque(maxlen=STAGE_LATENCY_BUFFER_SIZE)
+        self._should_stop_render = False
+        self._render_thread = None
 
-    def update(self, ego):
+    def update(self, ego, timestamp=None):
         if not ego:
             return
 
-        transform = self._to_transform(ego)
-        blueprint_id = ego.get("blueprint") or DEFAULT_EGO_BLUEPRINT
-        color = ego.get("color") or DEFAULT_EGO_COLOR
+        location = ego.get("location") or {}
+        sample = {
+            "timestamp": float(timestamp) if timestamp is not None else time.time(),
+            "x": float(location.get("x", 0.0)),
+            "y": float(location.get("y", 0.0)),
+            "z": float(location.get("z", 0.0)),
+            "yaw": float(ego.get("yaw", 0.0)),
+            "blueprint": ego.get("blueprint") or DEFAULT_EGO_BLUEPRINT,
+            "color": ego.get("color") or DEFAULT_EGO_COLOR,
+        }
+
+        with self._state_lock:
+            if self._samples and sample["timestamp"] < self._samples[-1]["timestamp"]:
+                return
+            self._samples.append(sample)
+            cutoff = sample["timestamp"] - EGO_SAMPLE_HISTORY_SECONDS
+            while self._samples and self._samples[0]["timestamp"] < cutoff:
+                self._samples.popleft()
+            self._last_update = time.time()
 
-        if self._actor and (
-            not self._actor.is_alive
-            or self._actor_blueprint != blueprint_id
-            or (
-                "color" in self._actor.attributes
-                and self._actor.attributes.get("color") != color
-            )
-        ):
-            self.destroy()
+    def start(self):
+        if self._render_thread and self._render_thread.is_alive():
+            return
 
-        if not self._actor:
-            self._spawn(transform, blueprint_id, color)
+        self._should_stop_render = False
+        self._render_thread = threading.Thread(target=self._render_loop, daemon=True)
+        self._render_thread.start()
+        print(
+            "[!] Ego mirror smoothing: "
+            f"delay={self._interpolation_delay * 1000:.0f}ms "
+            f"max_extrapolation={self._max_extrapolation * 1000:.0f}ms "
+            f"update_hz={self._update_hz:.0f}"
+        )
 
-        if self._actor:
-            self._actor.set_transform(transform)
-            self._last_update = time.time()
+    def shutdown(self):
+        self._should_stop_render = True
+        if self._render_thread:
+            self._render_thread.join(timeout=1)
+        self.destroy()
 
     def cleanup_if_stale(self):
         if self._actor and time.time() - self._last_update > self._ego_timeout:
             print(f"[!] Destroying stale CARLA ego actor after {self._ego_timeout:.1f}s without updates")
             self.destroy()
+            with self._state_lock:
+                self._samples.clear()
 
     def destroy(self):
         if self._actor:
@@ -150,19 +308,128 @@ class CarlaEgoMirror:
         except RuntimeError as e:
             print(f"[x] Failed to spawn CARLA ego mirror: {e}")
 
-    def _to_transform(self, ego):
-        location = ego.get("location") or {}
+    def _render_loop(self):
+        interval = 1.0 / self._update_hz
+        while not self._should_stop_render:
+            self._wait_for_render_tick(interval)
+            start = time.time()
+            try:
+                self.cleanup_if_stale()
+                self._render_once()
+            except Exception as e:
+                if self._stats:
+                    self._stats.record_error()
+                print(f"[x] Ego mirror render error: {e}")
+                continue
+            if self._stats:
+                self._stats.record(time.time() - start)
+
+    def _wait_for_render_tick(self, interval):
+        start = time.time()
+        try:
+            self._world.wait_for_tick(seconds=max(0.1, interval * 2.0))
+        except RuntimeError:
+            remaining = interval - (time.time() - start)
+            if remaining > 0.0:
+                time.sleep(max(0.001, remaining))
+
+    def _render_once(self):
+        target_time = time.time() - self._interpolation_delay
+        with self._state_lock:
+            samples = list(self._samples)
+        if not samples:
+            return
+
+        sample = select_render_sample(samples, target_time, self._max_extrapolation)
+        transform = self._sample_to_transform(sample)
+        blueprint_id = sample["blueprint"]
+        color = sample["color"]
+
+        if self._actor and (
+            not self._actor.is_alive
+            or self._actor_blueprint != blueprint_id
+            or (
+                "color" in self._actor.attributes
+                and self._actor.attributes.get("color") != color
+            )
+        ):
+            self.destroy()
+
+        if not self._actor:
+            self._spawn(transform, blueprint_id, color)
+
+        if self._actor:
+            self._actor.set_transform(transform)
+            self._record_position_error(sample, samples[-1])
+
+    def _record_position_error(self, rendered, latest):
+        error = math.sqrt(
+            (rendered["x"] - latest["x"]) ** 2
+            + (rendered["y"] - latest["y"]) ** 2
+            + (rendered["z"] - latest["z"]) ** 2
+        )
+        self._position_errors.append(error)
+        if self._stats:
+            errors = list(self._position_errors)
+            self._stats.set_value("position_error_m", round(sum(errors) / len(errors), 3))
+            self._stats.set_value("max_position_error_m", round(max(errors), 3))
+
+    def _sample_to_transform(self, sample):
         return carla.Transform(
-            carla.Location(
-                x=float(location.get("x", 0.0)),
-                y=float(location.get("y", 0.0)),
-                z=float(location.get("z", 0.0))
-            ),
-            carla.Rotation(yaw=float(ego.get("yaw", 0.0)))
+            carla.Location(x=sample["x"], y=sample["y"], z=sample["z"]),
+            carla.Rotation(yaw=sample["yaw"])
         )
 
 
-def _start_ego_udp_listener(redis_client, redis_channel, config):
+class EgoPoseCoalescer:
+    """Keeps only the newest ego pose per id between two Redis publishes.
+
+    Each pose keeps the time its UDP packet was received, so coalescing does
+    not move the sample time to the publish tick.
+    """
+
+    def __init__(self, stats):
+        self._stats = stats
+        self._pending = {}
+        self._last_sequences = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, ego, sequence, received):
+        ego_key = str(ego["id"])
+        if sequence is not None:
+            last_sequence = self._last_sequences.get(ego_key)
+            if (
+                last_sequence is not None
+                and sequence <= last_sequence
+                and last_sequence - sequence < SEQUENCE_RESET_WINDOW
+            ):
+                self._stats.increment("reordered")
+                return
+            self._last_sequences[ego_key] = sequence
+
+        if ego_key in self._pending:
+            self._stats.increment("coalesced")
+        self._pending[ego_key] = (ego, received)
+
+    def pop_all(self):
+        pending = self._pending
+        self._pending = {}
+        return pending
+
+
+def _packet_sequence(parsed, ego):
+    raw_sequence = ego.get("seq", parsed.get("seq"))
+    if raw_sequence is None:
+        return None
+    try:
+        return int(raw_sequence)
+    except (TypeError, ValueError):
+        return None
+
+
+def _start_ego_udp_listener(redis_client, redis_channel, config, stats):
     ego_host = _get_config_value(config, "UB_EGO_LISTEN_HOST", "ego_listen_host", DEFAULT_EGO_LISTEN_HOST)
     ego_port = _get_config_int(config, "UB_EGO_LISTEN_PORT", "ego_listen_port", DEFAULT_EGO_LISTEN_PORT)
     ego_id = _get_config_value(config, "UB_EGO_ID", "ego_id", DEFAULT_EGO_ID)
@@ -173,15 +440,27 @@ def _start_ego_udp_listener(redis_client, redis_channel, config):
         DEFAULT_EGO_BLUEPRINT
     )
     ego_color = _get_config_value(config, "UB_EGO_COLOR", "ego_color", DEFAULT_EGO_COLOR)
+    publish_hz = _get_config_float(config, "UB_EGO_PUBLISH_HZ", "ego_publish_hz", DEFAULT_EGO_PUBLISH_HZ)
+    publish_interval = 1.0 / publish_hz if publish_hz > 0 else 0.0
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind((ego_host, ego_port))
+    sock.setblocking(False)
+    coalescer = EgoPoseCoalescer(stats)
+    pipeline = redis_client.pipeline(transaction=False)
 
-    def receive_loop():
-        print(f"Listening for UB-MR ego UDP at {ego_host}:{ego_port}")
+    def drain_socket():
+        # Python has no recvmmsg binding, so emulate it by reading every
+        # datagram already queued on the non-blocking socket in one pass.
         while True:
             try:
-                data, addr = sock.recvfrom(65535)
+                data, addr = sock.recvfrom(UDP_RECEIVE_BUFFER_SIZE)
+            except BlockingIOError:
+                return
+            received = time.time()
+
+            stats.increment("received")
+            try:
                 parsed = json.loads(data.decode("utf-8"))
                 ego = parsed.get("ego", parsed)
                 if not isinstance(ego, dict) or "location" not in ego:
@@ -191,24 +470,132 @@ def _start_ego_udp_listener(redis_client, redis_channel, config):
                 ego.setdefault("id", ego_id)
                 ego.setdefault("blueprint", ego_blueprint)
                 ego.setdefault("color", ego_color)
-
-                message = {
-                    "id": "udp-bridge",
-                    "type": EGO_MESSAGE_TYPE,
-                    "timestamp": time.time(),
-                    "ego": ego
-                }
-                redis_client.publish(redis_channel, json.dumps(message))
+                coalescer.add(ego, _packet_sequence(parsed, ego), received)
             except Exception as e:
+                stats.record_error()
+                print(f"[x] Ignoring malformed ego packet from {addr[0]}:{addr[1]}: {e}")
+
+    def publish_pending():
+        start = time.time()
+        for ego, received in coalescer.pop_all().values():
+            message = {
+                "id": "udp-bridge",
+                "type": EGO_MESSAGE_TYPE,
+                "timestamp": received,
+                "ego": ego
+            }
+            pipeline.publish(redis_channel, json.dumps(message))
+        pipeline.execute()
+        stats.record(time.time() - start)
+
+    def receive_loop():
+        print(f"Listening for UB-MR ego UDP at {ego_host}:{ego_port} (publish cap {publish_hz:.0f} Hz)")
+        next_publish = 0.0
+        while True:
+            try:
+                timeout = max(0.0, next_publish - time.time()) if len(coalescer) else None
+                readable, _, _ = select.select([sock], [], [], timeout)
+                if readable:
+                    drain_socket()
+
+                now = time.time()
+                if len(coalescer) and now >= next_publish:
+                    publish_pending()
+                    next_publish = now + publish_interval
+            except (OSError, ValueError) as e:
+                # select/recvfrom fail this way once main() closes the socket.
                 print(f"[x] Ego UDP receive error: {e}")
-                if isinstance(e, OSError):
-                    break
+                break
+            except Exception as e:
+                stats.record_error()
+                print(f"[x] Ego UDP publish error: {e}")
 
     thread = threading.Thread(target=receive_loop, daemon=True)
     thread.start()
     return sock
 
 
+def _start_udp_sender(traffic_queue, stats, unity_addr, stop_event):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send_loop():
+        while not stop_event.is_set():
+            entry = traffic_queue.get(timeout=STAGE_POLL_INTERVAL)
+            if entry is None:
+                continue
+
+            enqueued_at, payload = entry
+            start = time.time()
+            try:
+                data = json.dumps(payload).encode("utf-8")
+
+                print(f"Sending {len(payload['vehicles'])} vehicles over the bridge")
+
+                if len(data) > 60000:
+                    print(f"Warning: payload size {len(data)} bytes is close to UDP limit")
+
+                sock.sendto(data, unity_addr)
+                stats.record(time.time() - start, start - enqueued_at)
+            except Exception as e:
+                stats.record_error()
+                print(f"[x] UDP sender error: {e}")
+
+        sock.close()
+
+    thread = threading.Thread(target=send_loop, daemon=True)
+    thread.start()
+    return thread
+
+
+def _start_ego_mirror_worker(ego_queue, stats, ego_mirror, stop_event):
+    def mirror_loop():
+        while not stop_event.is_set():
+            entry = ego_queue.get(timeout=STAGE_POLL_INTERVAL)
+            if entry is None:
+                continue
+
+            try:
+                enqueued_at, message = entry
+                start = time.time()
+                ego_mirror.update(message.get("ego"), message.get("timestamp"))
+                stats.record(time.time() - start, start - enqueued_at)
+            except Exception as e:
+                stats.record_error()
+                print(f"[x] Ego mirror error: {e}")
+
+    thread = threading.Thread(target=mirror_loop, daemon=True)
+    thread.start()
+    return thread
+
+
+def _start_stats_reporter(redis_client, stats_key, stages, interval, stop_event):
+    def report_loop():
+        while not stop_event.wait(interval):
+            report = {stage.name: stage.snapshot() for stage in stages}
+            summary = " ".join(
+                f"{name}[n={values['processed']} lat={values['avg_latency_ms']:.1f}ms"
+                + (
+                    f" depth={values['queue_depth']} dropped={values['queue_dropped']}"
+                    if "queue_depth" in values
+                    else ""
+                )
+                + "]"
+                for name, values in report.items()
+            )
+            print(f"[!] Bridge stages: {summary}")
+
+            if not stats_key:
+                continue
+            try:
+                redis_client.set(stats_key, json.dumps({"timestamp": time.time(), "stages": report}))
+            except Exception as e:
+                print(f"[x] Failed to export bridge stats to Redis key {stats_key}: {e}")
+
+    thread = threading.Thread(target=report_loop, daemon=True)
+    thread.start()
+    return thread
+
+
 def main():
     config = _load_json_config()
     redis_host = _get_config_value(config, "UB_REDIS_HOST", "host", DEFAULT_REDIS_HOST)
@@ -237,14 +624,76 @@ def main():
     )
     ego_timeout = _get_config_float(config, "UB_EGO_TIMEOUT", "ego_timeout", DEFAULT_EGO_TIMEOUT)
 
+    queue_size = _get_config_int(
+        config,
+        "UB_BRIDGE_QUEUE_SIZE",
+        "bridge_queue_size",
+        DEFAULT_BRIDGE_QUEUE_SIZE
+    )
+    stats_interval = _get_config_float(
+        config,
+        "UB_BRIDGE_STATS_INTERVAL",
+        "bridge_stats_interval",
+        DEFAULT_BRIDGE_STATS_INTERVAL
+    )
+    stats_key = _get_config_value(
+        config,
+        "UB_BRIDGE_STATS_KEY",
+        "bridge_stats_key",
+        DEFAULT_BRIDGE_STATS_KEY
+    )
+
     r = redis.Redis(host=redis_host, port=redis_port, password=redis_password or None)
     pubsub = r.pubsub()
     pubsub.subscribe(redis_channel)
-    ego_listener = _start_ego_udp_listener(r, redis_channel, config)
-    ego_mirror = CarlaEgoMirror(carla_host, carla_port, carla_timeout, ego_timeout)
+    listener_stats = StageStats("ego_listener")
+    ego_listener = _start_ego_udp_listener(r, redis_channel, config, listener_stats)
+    ego_interpolation_delay = _get_config_float(
+        config,
+        "UB_EGO_INTERPOLATION_DELAY_MS",
+        "ego_interpolation_delay_ms",
+        DEFAULT_EGO_INTERPOLATION_DELAY_MS
+    )
+    ego_max_extrapolation = _get_config_float(
+        config,
+        "UB_EGO_MAX_EXTRAPOLATION_MS",
+        "ego_max_extrapolation_ms",
+        DEFAULT_EGO_MAX_EXTRAPOLATION_MS
+    )
+    ego_render_hz = _get_config_float(config, "UB_EGO_RENDER_HZ", "ego_render_hz", DEFAULT_EGO_RENDER_HZ)
+    render_stats = StageStats("ego_render")
+    ego_mirror = CarlaEgoMirror(
+        carla_host,
+        carla_port,
+        carla_timeout,
+        ego_timeout,
+        interpolation_delay=ego_interpolation_delay / 1000.0,
+        max_extrapolation=ego_max_extrapolation / 1000.0,
+        update_hz=ego_render_hz,
+        stats=render_stats
+    )
+    ego_mirror.start()
 
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     unity_addr = (unity_host, unity_port)
+    traffic_queue = LatestValueQueue("unity", queue_size)
+    ego_queue = LatestValueQueue("ego", queue_size)
+    reader_stats = StageStats("redis_reader")
+    sender_stats = StageStats("udp_sender", traffic_queue)
+    mirror_stats = StageStats("ego_mirror", ego_queue)
+    stop_event = threading.Event()
+
+    workers = [
+        _start_udp_sender(traffic_queue, sender_stats, unity_addr, stop_event),
+        _start_ego_mirror_worker(ego_queue, mirror_stats, ego_mirror, stop_event),
+    ]
+    if stats_interval > 0:
+        _start_stats_reporter(
+            r,
+            stats_key,
+            (listener_stats, reader_stats, sender_stats, mirror_stats, render_stats),
+            stats_interval,
+            stop_event
+        )
 
     print(f"Subscribed to Redis channel '{redis_channel}'")
     print(f"Forwarding to Unity at {unity_host}:{unity_port}")
@@ -252,9 +701,10 @@ def main():
 
     try:
         for raw_message in pubsub.listen():
-            ego_mirror.cleanup_if_stale()
             if raw_message["type"] != "message":
                 continue
+
+            start = time.time()
             try:
                 parsed = json.loads(raw_message["data"])
                 message_type = parsed.get("type")
@@ -263,28 +713,26 @@ def main():
                     if "vehicles" not in parsed:
                         continue
 
-                    payload = {
+                    traffic_queue.put({
                         "vehicles": parsed["vehicles"],
                         "timestamp": parsed["timestamp"]
-                    }
-
-                    data = json.dumps(payload).encode("utf-8")
-
-                    print(f"Sending {len(payload['vehicles'])} vehicles over the bridge")
-
-                    if len(data) > 60000:
-                        print(f"Warning: payload size {len(data)} bytes is close to UDP limit")
-
-                    sock.sendto(data, unity_addr)
+                    })
+                elif message_type == EGO_MESSAGE_TYPE:
+                    ego_queue.put(parsed)
+                else:
                     continue
 
-                if message_type == EGO_MESSAGE_TYPE:
-                    ego_mirror.update(parsed.get("ego"))
-
+                reader_stats.record(time.time() - start)
             except Exception as e:
+                reader_stats.record_error()
                 print(f"Error: {e}")
     finally:
-        ego_mirror.destroy()
+        stop_event.set()
+        traffic_queue.close()
+        ego_queue.close()
+        for worker in workers:
+            worker.join(timeout=1)
+        ego_mirror.shutdown()
         ego_listener.close()
 
 if __name__ == "__main__":
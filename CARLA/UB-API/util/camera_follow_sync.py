@@ -1,12 +1,14 @@
 import argparse
 import carla
 import os
+import threading
 import time
 from ub_carla import find_ego
 
 
 DEFAULT_ROLE_NAMES = ("ego_vehicle", "hero", "actor", "autopilot")
 DEFAULT_UPDATE_HZ = 30.0
+LAG_REPORT_INTERVAL_SECONDS = 10.0
 
 
 def _role_names(value):
@@ -58,7 +60,7 @@ def parse_args():
         "--update-hz",
         type=float,
         default=float(os.environ.get("UB_CAMERA_FOLLOW_UPDATE_HZ", str(DEFAULT_UPDATE_HZ))),
-        help="Polling rate for passive spectator updates.",
+        help="Maximum spectator update rate; updates run in the world tick callback.",
     )
     return parser.parse_args()
 
@@ -91,11 +93,102 @@ def update_spectator(spectator, ego, args):
     return transform
 
 
+class TickFollowCamera:
+    """Moves the spectator from the world tick callback using the ego pose in the tick snapshot.
+
+    Each update costs a single set_transform RPC issued in the same tick the
+    pose was sampled from, instead of a get_transform/set_transform pair from
+    a sleeping loop that trails the simulation by up to one frame.
+    """
+
+    def __init__(self, world, spectator, args):
+        self._world = world
+        self._spectator = spectator
+        self._args = args
+        self._min_interval = 1.0 / max(args.update_hz, 1.0)
+        self._ego_id = None
+        self._callback_id = None
+        self._last_update = 0.0
+        self._lost = threading.Event()
+        # Client clock only: time spent in set_transform per update.
+        self._rpc_samples = []
+        # Server frames only: frames elapsed between two consecutive camera updates.
+        self._frame_gaps = []
+        self._last_frame = None
+        self._last_report = time.time()
+
+    @property
+    def lost(self):
+        return self._lost
+
+    def follow(self, ego):
+        self._ego_id = ego.id
+        self._last_frame = None
+        self._lost.clear()
+        if self._callback_id is None:
+            self._callback_id = self._world.on_tick(self._on_tick)
+
+    def stop(self):
+        if self._callback_id is not None:
+            self._world.remove_on_tick(self._callback_id)
+            self._callback_id = None
+
+    def _on_tick(self, snapshot):
+        received = time.time()
+        if self._lost.is_set() or received - self._last_update < self._min_interval * 0.9:
+            return
+
+        actor_snapshot = snapshot.find(self._ego_id)
+        if actor_snapshot is None:
+            self._lost.set()
+            return
+
+        try:
+            self._spectator.set_transform(
+                camera_transform_for_vehicle(
+                    actor_snapshot.get_transform(),
+                    distance=self._args.distance,
+                    height=self._args.height,
+                    pitch=self._args.pitch,
+                )
+            )
+        except RuntimeError:
+            self._lost.set()
+            return
+
+        self._last_update = received
+        self._rpc_samples.append(time.time() - received)
+        if self._last_frame is not None:
+            self._frame_gaps.append(snapshot.frame - self._last_frame)
+        self._last_frame = snapshot.frame
+        if received - self._last_report >= LAG_REPORT_INTERVAL_SECONDS:
+            self._report_lag(received)
+
+    def _report_lag(self, now):
+        updates = len(self._rpc_samples)
+        frame_gap = sum(self._frame_gaps) / len(self._frame_gaps) if self._frame_gaps else 0.0
+        print(
+            f"Camera follow: {updates / (now - self._last_report):.1f} updates/s, "
+            f"set_transform avg={1000 * sum(self._rpc_samples) / updates:.1f}ms "
+            f"max={1000 * max(self._rpc_samples):.1f}ms, "
+            f"frames between updates avg={frame_gap:.1f}"
+        )
+        self._rpc_samples = []
+        self._frame_gaps = []
+        self._last_report = now
+
+
+def _print_following(ego):
+    print(
+        "Following ego vehicle: "
+        f"id={ego.id}, type={ego.type_id}, role_name={ego.attributes.get('role_name')}"
+    )
+
+
 def main():
     args = parse_args()
     wait_seconds = None if args.wait_seconds <= 0 else args.wait_seconds
     role_names = _role_names(args.role_names)
-    update_interval = 1.0 / max(args.update_hz, 1.0)
 
     client = carla.Client(args.host, args.port)
     client.set_timeout(10.0)
@@ -110,34 +203,32 @@ def main():
     if ego is None:
         raise RuntimeError("No vehicles found in the simulation within timeout.")
 
-    print(f"Following ego vehicle: id={ego.id}, type={ego.type_id}, role_name={ego.attributes.get('role_name')}")
+    _print_following(ego)
 
     spectator = world.get_spectator()
     update_spectator(spectator, ego, args)
+    camera = TickFollowCamera(world, spectator, args)
+    camera.follow(ego)
 
     try:
         while True:
-            try:
-                update_spectator(spectator, ego, args)
-            except RuntimeError:
-                ego = find_ego(
-                    world,
-                    role_names=role_names,
-                    wait_seconds=1.0,
-                    fallback_to_any=args.fallback_to_any,
-                )
-                if ego is None:
-                    time.sleep(update_interval)
-                    continue
-                print(
-                    "Following ego vehicle: "
-                    f"id={ego.id}, type={ego.type_id}, role_name={ego.attributes.get('role_name')}"
-                )
-                update_spectator(spectator, ego, args)
-            time.sleep(update_interval)
+            if not camera.lost.wait(timeout=1.0):
+                continue
+            ego = find_ego(
+                world,
+                role_names=role_names,
+                wait_seconds=1.0,
+                fallback_to_any=args.fallback_to_any,
+            )
+            if ego is None:
+                continue
+            _print_following(ego)
+            camera.follow(ego)
 
     except KeyboardInterrupt:
         pass
+    finally:
+        camera.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+"""
+Cached radius and nearest-neighbour queries over map spawn points and waypoints.
+
+Indexes are built once per map name (and per waypoint spacing) and kept for the
+lifetime of the process, so repeated scenario setup on large maps does not
+rescan every spawn point with Python distance math.
+"""
+
+import numpy as np
+
+
+DEFAULT_CELL_SIZE = 25.0
+DEFAULT_WAYPOINT_DISTANCE = 2.0
+
+_index_cache = {}  # {(map_name, kind, *params): SpatialIndex}
+_episode_map = (None, None)  # (world episode id, carla.Map) of the current episode
+
+
+class SpatialIndex:
+    """Uniform 2D grid over 3D points; distances are full 3D Euclidean."""
+
+    def __init__(self, items, locations, cell_size=DEFAULT_CELL_SIZE):
+        self.items = list(items)
+        self.cell_size = cell_size
+        self._points = np.asarray(locations, dtype=float).reshape(-1, 3)
+        self._cells = {}
+        cell_keys = np.floor(self._points[:, :2] / cell_size).astype(np.int64)
+        for index, (cell_x, cell_y) in enumerate(cell_keys):
+            self._cells.setdefault((int(cell_x), int(cell_y)), []).append(index)
+        self._cells = {cell: np.array(indices) for cell, indices in self._cells.items()}
+        if len(self._points):
+            self._extent = float(np.ptp(self._points[:, :2], axis=0).max()) + cell_size
+        else:
+            self._extent = 0.0
+
+    @classmethod
+    def from_transforms(cls, transforms, cell_size=DEFAULT_CELL_SIZE):
+        transforms = list(transforms)
+        locations = [(t.location.x, t.location.y, t.location.z) for t in transforms]
+        return cls(transforms, locations, cell_size)
+
+    def __len__(self):
+        return len(self.items)
+
+    def query_radius(self, location, radius):
+        """Return ``[(item, distance)]`` within ``radius`` of ``location``, nearest first."""
+        indices, distances = self._radius_indices(_as_array(location), radius)
+        return [(self.items[i], float(d)) for i, d in zip(indices, distances)]
+
+    def query_knn(self, location, k):
+        """Return the ``k`` nearest ``[(item, distance)]`` to ``location``, nearest first."""
+        if k <= 0 or not len(self.items):
+            return []
+
+        point = _as_array(location)
+        radius = self.cell_size
+        while radius < self._extent:
+            indices, distances = self._radius_indices(point, radius)
+            if len(indices) >= k:
+                return [(self.items[i], float(d)) for i, d in zip(indices[:k], distances[:k])]
+            radius *= 2.0
+
+        distances = np.linalg.norm(self._points - point, axis=1)
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(self.items[i], float(distances[i])) for i in order]
+
+    def _radius_indices(self, point, radius):
+        min_x, min_y = np.floor((point[:2] - radius) / self.cell_size).astype(np.int64)
+        max_x, max_y = np.floor((point[:2] + radius) / self.cell_size).astype(np.int64)
+        candidates = [
+            self._cells[(cell_x, cell_y)]
+            for cell_x in range(int(min_x), int(max_x) + 1)
+            for cell_y in range(int(min_y), int(max_y) + 1)
+            if (cell_x, cell_y) in self._cells
+        ]
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        candidates = np.concatenate(candidates)
+        distances = np.linalg.norm(self._points[candidates] - point, axis=1)
+        within = distances <= radius
+        candidates = candidates[within]
+        distances = distances[within]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+
+def _as_array(location):
+    return np.array((location.x, location.y, location.z), dtype=float)
+
+
+def get_map(world):
+    """Return ``world.get_map()``, fetching the OpenDRIVE map only once per episode."""
+    global _episode_map
+    episode_id = world.id
+    cached_id, carla_map = _episode_map
+    if carla_map is None or cached_id != episode_id:
+        # Only the current episode is kept, so a reloaded world releases the previous map.
+        carla_map = world.get_map()
+        _episode_map = (episode_id, carla_map)
+    return carla_map
+
+
+def spawn_point_index(world, cell_size=DEFAULT_CELL_SIZE):
+    carla_map = get_map(world)
+    key = (carla_map.name, "spawn_points", cell_size)
+    index = _index_cache.get(key)
+    if index is None:
+        index = SpatialIndex.from_transforms(carla_map.get_spawn_points(), cell_size)
+        _index_cache[key] = index
+    return index
+
+
+def waypoint_index(world, distance=DEFAULT_WAYPOINT_DISTANCE, cell_size=DEFAULT_CELL_SIZE):
+    carla_map = get_map(world)
+    key = (carla_map.name, "waypoints", distance, cell_size)
+    index = _index_cache.get(key)
+    if index is None:
+        waypoints = carla_map.generate_waypoints(distance)
+        locations = [
+            (wp.transform.location.x, wp.transform.location.y, wp.transform.location.z)
+            for wp in waypoints
+        ]
+        index = SpatialIndex(waypoints, locations, cell_size)
+        _index_cache[key] = index
+    return index
+
+
+def clear_cache():
+    global _episode_map
+    _index_cache.clear()
+    _episode_map = (None, None)
@@ -6,13 +6,25 @@ Minimal script to spawn traffic in CARLA simulator
 import carla
 import random
 import time
-import carla
 import argparse
-import math
+from carla.command import FutureActor, SetAutopilot, SpawnActor
+from spatial_index import spawn_point_index
 from ub_carla import find_ego
 
-def spawn_traffic(world, location, radius, num_vehicles=150):
-    """Spawn traffic vehicles in CARLA"""
+def _report(kind, spawned, requested, start_time):
+    failed = requested - spawned
+    print(f"\nSpawned {spawned}/{requested} {kind} ({failed} failed) in {time.time() - start_time:.2f}s")
+
+def _next_frame(world):
+    """Advance one frame: a synchronous world is ticked by this client, otherwise wait for the server"""
+    if world.get_settings().synchronous_mode:
+        world.tick()
+    else:
+        world.wait_for_tick()
+
+def spawn_traffic(client, world, location, radius, num_vehicles=150):
+    """Spawn autopilot traffic vehicles in one batch, returning their actor IDs"""
+    start_time = time.time()
     spawn_points = get_nearby_spawn_points(world, location, radius)
     
     # Limit number of vehicles to available spawn points
@@ -22,61 +34,66 @@ def spawn_traffic(world, location, radius, num_vehicles=150):
     blueprint_library = world.get_blueprint_library()
     vehicle_blueprints = blueprint_library.filter('vehicle.*')
     
-    # Spawn vehicles
+    # Spawn the vehicles and enable autopilot in a single round trip
+    batch = [
+        SpawnActor(random.choice(vehicle_blueprints), spawn_points[i])
+        .then(SetAutopilot(FutureActor, True))
+        for i in range(num_vehicles)
+    ]
     vehicles = []
-    for i in range(num_vehicles):
-        # Spawn the vehicle
-        blueprint = random.choice(vehicle_blueprints)
-        vehicle = world.try_spawn_actor(blueprint, spawn_points[i])
-        
-        if vehicle is not None:
-            # Enable autopilot
-            vehicle.set_autopilot(True)
-            vehicles.append(vehicle)
-            print(f"Spawned vehicle {i+1}/{num_vehicles}")
+    for response in client.apply_batch_sync(batch, False):
+        if not response.error:
+            vehicles.append(response.actor_id)
     
-    print(f"\nSuccessfully spawned {len(vehicles)} vehicles with autopilot enabled")
+    _report("vehicles with autopilot enabled", len(vehicles), num_vehicles, start_time)
     return vehicles
 
-def spawn_pedestrians(world, location, radius, num_pedestrians=10, map_name=None):
+def spawn_pedestrians(client, world, location, radius, num_pedestrians=10, map_name=None):
+    """Spawn walkers and their AI controllers in batches, returning all actor IDs"""
+    start_time = time.time()
     spawn_points = get_nearby_spawn_points(world, location, radius)
     # Limit number of pedestrians to available spawn points
     num_pedestrians = min(num_pedestrians, len(spawn_points))
 
-    # Get blueprint library and filter for vehicles
+    # Get blueprint library and filter for pedestrians
     blueprint_library = world.get_blueprint_library()
     pedestrian_blueprints = blueprint_library.filter('walker.pedestrian.*')
     
-    # Spawn pedestrians
-    pedestrians = []
-    for i in range(num_pedestrians):
-        # Spawn the vehicle
-        blueprint = random.choice(pedestrian_blueprints)
-        pedestrian = world.try_spawn_actor(blueprint, spawn_points[i])
-        
-        if pedestrian is not None:
-            pedestrians.append(pedestrian)
-            print(f"Spawned pedestrian {i+1}/{num_pedestrians}")
-    
-    print(f"\nSuccessfully spawned {len(pedestrians)} pedestrians")
-    return pedestrians
+    # 1. Spawn the walkers
+    batch = [
+        SpawnActor(random.choice(pedestrian_blueprints), spawn_points[i])
+        for i in range(num_pedestrians)
+    ]
+    walkers = [
+        response.actor_id
+        for response in client.apply_batch_sync(batch, False)
+        if not response.error
+    ]
+
+    # 2. Spawn one AI controller attached to each walker
+    controller_blueprint = blueprint_library.find('controller.ai.walker')
+    batch = [SpawnActor(controller_blueprint, carla.Transform(), walker) for walker in walkers]
+    controllers = [
+        response.actor_id
+        for response in client.apply_batch_sync(batch, False)
+        if not response.error
+    ]
+
+    # 3. Start the controllers once the client has seen the new actors
+    if controllers:
+        _next_frame(world)
+        for controller in world.get_actors(controllers):
+            controller.start()
+            destination = world.get_random_location_from_navigation()
+            if destination is not None:
+                controller.go_to_location(destination)
+
+    _report("pedestrians", len(walkers), num_pedestrians, start_time)
+    return controllers + walkers
 
 def get_nearby_spawn_points(world, reference_location, radius=20.0):
-    spawn_points = world.get_map().get_spawn_points()
-    near = []
-    for sp in spawn_points:
-        loc = sp.location
-        dist = math.sqrt(
-            (loc.x - reference_location.x)**2 +
-            (loc.y - reference_location.y)**2 +
-            (loc.z - reference_location.z)**2
-        )
-        if dist <= radius:
-            near.append((sp, dist))
-    
-    # Sort by distance
-    near.sort(key=lambda x: x[1])
-    return [sp for sp, _ in near]
+    """Spawn points within radius of reference_location, nearest first"""
+    return [sp for sp, _ in spawn_point_index(world).query_radius(reference_location, radius)]
 
 if __name__ == "__main__":
     # Parse command-line arguments
@@ -106,8 +123,8 @@ if __name__ == "__main__":
         world = client.get_world()
         # Spawn near Ego-Vehicle
         ego_location = find_ego(world, wait_seconds=10.0).get_transform().location
-        vehicles = spawn_traffic(world, ego_location, 50, num_vehicles=args.vehicles)
-        pedestrians = spawn_pedestrians(world, ego_location, 20, num_pedestrians=args.pedestrians)
+        vehicles = spawn_traffic(client, world, ego_location, 50, num_vehicles=args.vehicles)
+        pedestrians = spawn_pedestrians(client, world, ego_location, 20, num_pedestrians=args.pedestrians)
         print("\nTraffic is running. Press Ctrl+C to stop and cleanup...")
         
         # Keep the script running
@@ -129,5 +146,7 @@ if __name__ == "__main__":
                 print(f"Destroyed {len(vehicles)} vehicles")
             if pedestrians:
                 print("Cleaning up pedestrians...")
+                for controller in world.get_actors(pedestrians).filter('controller.ai.walker'):
+                    controller.stop()
                 client.apply_batch([carla.command.DestroyActor(x) for x in pedestrians])
                 print(f"Destroyed {len(pedestrians)} pedestrians")
\ No newline at end of file
@@ -1,8 +1,80 @@
+import queue
+import threading
 import time
 
 
 DEFAULT_WAIT_INTERVAL_SECONDS = 0.05
 
+_watchers = {}  # {world episode id: ActorWatcher}
+_watchers_lock = threading.Lock()
+_ego_cache = {}  # {(world episode id, role names): carla.Actor}
+
+
+class ActorWatcher:
+    """Shared world.on_tick subscription that reports actor spawn/destroy deltas.
+
+    Listeners are called from the CARLA tick callback thread with
+    ``(new_ids, removed_ids, snapshot)`` and should only hand the ids off;
+    the tick callback is removed again once the last listener unsubscribes.
+    """
+
+    def __init__(self, world):
+        self._world = world
+        self._known_ids = None
+        self._listeners = {}
+        self._next_token = 0
+        self._callback_id = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener):
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._listeners[token] = listener
+            if self._callback_id is None:
+                self._known_ids = {actor_snapshot.id for actor_snapshot in self._world.get_snapshot()}
+                self._callback_id = self._world.on_tick(self._on_tick)
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._listeners.pop(token, None)
+            if self._listeners or self._callback_id is None:
+                return
+            callback_id = self._callback_id
+            self._callback_id = None
+        self._world.remove_on_tick(callback_id)
+
+    def _on_tick(self, snapshot):
+        actor_ids = {actor_snapshot.id for actor_snapshot in snapshot}
+        with self._lock:
+            known_ids = self._known_ids
+            self._known_ids = actor_ids
+            listeners = list(self._listeners.values())
+        new_ids, removed_ids = actor_ids - known_ids, known_ids - actor_ids
+        if not new_ids and not removed_ids:
+            return
+        for listener in listeners:
+            listener(new_ids, removed_ids, snapshot)
+
+
+def _watcher_for(world):
+    with _watchers_lock:
+        watcher = _watchers.get(world.id)
+        if watcher is None:
+            watcher = ActorWatcher(world)
+            _watchers[world.id] = watcher
+        return watcher
+
+
+def subscribe_actor_events(world, listener):
+    """Call ``listener(new_ids, removed_ids, snapshot)`` whenever actors spawn or are destroyed."""
+    return _watcher_for(world).subscribe(listener)
+
+
+def unsubscribe_actor_events(world, token):
+    _watcher_for(world).unsubscribe(token)
+
 
 def _normalized_role_names(role_names):
     if isinstance(role_names, str):
@@ -10,6 +82,14 @@ def _normalized_role_names(role_names):
     return tuple(role_names or ())
 
 
+def _match_role(vehicles, wanted):
+    for v in vehicles:
+        rn = (v.attributes.get('role_name') or '').strip()
+        if rn in wanted:
+            return v
+    return None
+
+
 def find_ego(
     world,
     role_names=("ego_vehicle",),
@@ -17,16 +97,52 @@ def find_ego(
     fallback_to_any=True,
     wait_interval_seconds=DEFAULT_WAIT_INTERVAL_SECONDS,
 ):
+    role_names = _normalized_role_names(role_names)
+    wanted = set(role_names)
+    cache_key = (world.id, role_names)
+    cached = _ego_cache.get(cache_key)
+    if cached is not None:
+        if cached.is_alive:
+            return cached
+        _ego_cache.pop(cache_key, None)
+
     deadline = None if wait_seconds is None else time.time() + wait_seconds
-    wanted = set(_normalized_role_names(role_names))
-    while deadline is None or time.time() < deadline:
+
+    # In a synchronous world ticked by the calling script no tick arrives while waiting here, so
+    # actor deltas are never reported: fall back to polling the actor list.
+    poll = world.get_settings().synchronous_mode
+
+    # Subscribe before the initial scan so an ego spawned in between is not missed.
+    new_actor_ids = queue.Queue()
+    token = subscribe_actor_events(world, lambda new_ids, removed_ids, snapshot: new_actor_ids.put(new_ids))
+    try:
         vehicles = list(world.get_actors().filter('vehicle.*')) #TODO: change this to find the vehicle.lincoln.mkz_2017
-        if vehicles:
-            for v in vehicles:
-                rn = (v.attributes.get('role_name') or '').strip()
-                if rn in wanted:
-                    return v
-            if fallback_to_any:
+        while True:
+            ego = _match_role(vehicles, wanted)
+            if ego is not None:
+                _ego_cache[cache_key] = ego
+                return ego
+            if vehicles and fallback_to_any:
                 return vehicles[0]  # fallback
-        time.sleep(wait_interval_seconds)
-    return None
+
+            # Only actors that appeared since the last check need their role looked up.
+            ids = set()
+            vehicles = []
+            while not ids:
+                if deadline is not None and time.time() >= deadline:
+                    return None
+                try:
+                    # Waking on the local queue is free; no RPC is made until actors appear.
+                    ids = set(new_actor_ids.get(timeout=wait_interval_seconds))
+                except queue.Empty:
+                    if poll:
+                        vehicles = list(world.get_actors().filter('vehicle.*'))
+                        if vehicles:
+                            break
+                    continue
+            if ids:
+                while not new_actor_ids.empty():
+                    ids |= new_actor_ids.get_nowait()
+                vehicles = list(world.get_actors(list(ids)).filter('vehicle.*'))
+    finally:
+        unsubscribe_actor_events(world, token)